@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import os
+import re
+
+from flask import abort, current_app, request
+
+from compression import brotli
+
+ASSET_MAX_AGE = 365 * 24 * 60 * 60
+MIMETYPES = {'.css': 'text/css', '.js': 'text/javascript'}
+
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+CSS_PUNCTUATION_RE = re.compile(r'\s*([{};:,])\s*')
+
+
+def minify_css(source):
+    source = CSS_COMMENT_RE.sub('', source)
+    source = ''.join(line.strip() for line in source.splitlines())
+    return CSS_PUNCTUATION_RE.sub(r'\1', source).replace(';}', '}')
+
+
+def minify_js(source):
+    # Deliberately conservative: drops indentation, blank lines and whole-line
+    # comments but keeps line breaks, so automatic semicolon insertion is unaffected
+    lines = (line.strip() for line in source.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//')) + '\n'
+
+
+class AssetBundle:
+    def __init__(self, name, source, minify):
+        extension = os.path.splitext(name)[1]
+        if minify:
+            source = minify_css(source) if extension == '.css' else minify_js(source)
+        self.name = name
+        self.mimetype = MIMETYPES.get(extension, 'application/octet-stream')
+        self.body = source.encode('utf-8')
+        self.digest = hashlib.sha256(self.body).hexdigest()[:12]
+        self.filename = f"{os.path.splitext(name)[0]}.{self.digest}{extension}"
+
+        # Precompressed once at startup and reused for every request
+        self.variants = {'gzip': gzip.compress(self.body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(self.body, quality=11)
+
+
+class AssetPipeline:
+    """CSS/JS bundles built from the files in assets/ when the app starts.
+
+    Each bundle is concatenated, optionally minified, fingerprinted with a hash of its
+    contents and precompressed. It is served from /static/bundles/<name>.<hash>.<ext>
+    with an immutable Cache-Control, so browsers fetch it once per deploy.
+    """
+
+    def __init__(self, source_dir, bundles, minify=True):
+        self.source_dir = source_dir
+        self.bundles = {}
+        self._by_filename = {}
+        for name, sources in bundles.items():
+            text = '\n'.join(self._read(source) for source in sources)
+            bundle = AssetBundle(name, text, minify)
+            self.bundles[name] = bundle
+            self._by_filename[bundle.filename] = bundle
+
+    def _read(self, source):
+        with open(os.path.join(self.source_dir, source), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    @property
+    def version(self):
+        return ''.join(bundle.digest for bundle in self.bundles.values())
+
+    def filename(self, name):
+        return self.bundles[name].filename
+
+    def response(self, filename):
+        bundle = self._by_filename.get(filename)
+        if bundle is None:
+            abort(404)
+
+        encoding = None
+        for candidate in ('br', 'gzip'):
+            if candidate in bundle.variants and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+
+        response = current_app.response_class(bundle.variants[encoding] if encoding else bundle.body,
+                                              mimetype=bundle.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.max_age = ASSET_MAX_AGE
+        response.cache_control.immutable = True
+        response.set_etag(f"{bundle.digest}-{encoding or 'identity'}")
+        return response.make_conditional(request)
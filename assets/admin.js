@@ -0,0 +1,219 @@
+// Load one entry's edit form into its tab
+function loadTab(tab) {
+    tab.innerHTML = '<p>Loading...</p>';
+    return fetch(tab.dataset.src)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            return response.text();
+        })
+        .then(html => {
+            tab.innerHTML = html;
+            tab.dataset.loaded = 'true';
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            tab.innerHTML = '<div class="error-message">Error loading editor</div>';
+        });
+}
+
+// Tab switching; each tab's form is fetched the first time it is shown
+function showTab(platform, action) {
+    const section = document.getElementById(platform);
+    const tab = document.getElementById(`${platform}-${action}-tab`);
+
+    section.querySelectorAll('.tab-content').forEach(content => {
+        content.classList.remove('active');
+    });
+    tab.classList.add('active');
+
+    section.querySelectorAll('.action-tab').forEach(button => {
+        button.classList.toggle('active', button.dataset.action === action);
+    });
+
+    if (!tab.dataset.loaded) {
+        loadTab(tab);
+    }
+}
+
+// Opening a platform shows its first action
+document.querySelectorAll('.platform-section').forEach(section => {
+    section.addEventListener('toggle', () => {
+        if (section.open && !section.querySelector('.tab-content.active')) {
+            showTab(section.dataset.platform, section.querySelector('.action-tab').dataset.action);
+        }
+    });
+});
+
+// Reopen the platform that was just saved
+if (location.hash) {
+    const section = document.getElementById(decodeURIComponent(location.hash.slice(1)));
+    if (section && section.classList.contains('platform-section')) {
+        section.open = true;
+    }
+}
+
+// Remove media (image or video), then reload just that form
+function removeMedia(platform, action, mediaType, index) {
+    if (confirm(`Are you sure you want to remove this ${mediaType}?`)) {
+        fetch('/remove_media', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                platform: platform,
+                action: action,
+                media_type: mediaType,
+                index: index
+            })
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                loadTab(document.getElementById(`${platform}-${action}-tab`));
+            } else {
+                alert('Error removing media');
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('Error removing media');
+        });
+    }
+}
+
+// Large files go through the chunked upload API with a progress bar. An upload's
+// id is remembered per file, so picking the same file again after a failure or
+// a page reload resumes from the bytes the server already has.
+const UPLOAD_RETRIES = 5;
+
+function uploadKey(file, platform, action) {
+    return `upload:${platform}:${action}:${file.name}:${file.size}:${file.lastModified}`;
+}
+
+function uploadRequest(url, options) {
+    return fetch(url, options).then(response => response.json().then(data => {
+        if (!response.ok && response.status !== 409) {
+            throw new Error(data.error || `HTTP ${response.status}`);
+        }
+        return data;
+    }));
+}
+
+async function startUpload(form, file, mediaType) {
+    const platform = form.elements.platform.value;
+    const action = form.elements.action_type.value;
+    const key = uploadKey(file, platform, action);
+    const saved = localStorage.getItem(key);
+    if (saved) {
+        try {
+            const status = await uploadRequest(`${form.dataset.uploadUrl}/${saved}`);
+            if (status.success) {
+                return {key: key, uploadId: saved, received: status.received, chunkSize: status.chunk_size};
+            }
+        } catch (error) {
+            // Expired or already finalized: start over
+        }
+    }
+    const created = await uploadRequest(form.dataset.uploadUrl, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({
+            platform: platform,
+            action: action,
+            media_type: mediaType,
+            filename: file.name,
+            size: file.size
+        })
+    });
+    localStorage.setItem(key, created.upload_id);
+    return {key: key, uploadId: created.upload_id, received: 0, chunkSize: created.chunk_size};
+}
+
+async function uploadFile(form, file, mediaType, onProgress) {
+    const upload = await startUpload(form, file, mediaType);
+    const url = `${form.dataset.uploadUrl}/${upload.uploadId}`;
+    let received = upload.received;
+    let failures = 0;
+    onProgress(received);
+
+    while (received < file.size) {
+        try {
+            const data = await uploadRequest(url, {
+                method: 'PUT',
+                headers: {'Upload-Offset': String(received)},
+                body: file.slice(received, received + upload.chunkSize)
+            });
+            if (data.received === undefined) {
+                throw new Error(data.error);
+            }
+            // On a 409 the server says where to continue from
+            received = data.received;
+            failures = 0;
+            onProgress(received);
+        } catch (error) {
+            failures += 1;
+            if (failures > UPLOAD_RETRIES) {
+                throw error;
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+            const status = await uploadRequest(url).catch(() => null);
+            if (status && status.success) {
+                received = status.received;
+            }
+        }
+    }
+
+    const result = await uploadRequest(`${url}/finalize`, {method: 'POST'});
+    if (!result.success) {
+        throw new Error(result.error);
+    }
+    localStorage.removeItem(upload.key);
+}
+
+document.addEventListener('submit', async event => {
+    const form = event.target;
+    if (!form.classList.contains('admin-form')) {
+        return;
+    }
+    const inputs = [[form.elements.image_files, 'image'], [form.elements.video_files, 'video']];
+    const files = [];
+    inputs.forEach(([input, mediaType]) => {
+        Array.from(input.files).forEach(file => files.push([file, mediaType]));
+    });
+    if (!files.length) {
+        return;
+    }
+    event.preventDefault();
+
+    const progress = form.querySelector('.upload-progress');
+    const bar = progress.querySelector('progress');
+    const status = progress.querySelector('.upload-status');
+    const submit = form.querySelector('button[type="submit"]');
+    const total = files.reduce((sum, [file]) => sum + file.size, 0);
+    let done = 0;
+    progress.hidden = false;
+    submit.disabled = true;
+
+    try {
+        for (const [file, mediaType] of files) {
+            await uploadFile(form, file, mediaType, received => {
+                bar.value = Math.floor((done + received) / total * 100);
+                status.textContent = `Uploading ${file.name}: ${Math.floor(received / file.size * 100)}%`;
+            });
+            done += file.size;
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        status.textContent = `Upload failed: ${error.message}. Save again to resume.`;
+        submit.disabled = false;
+        return;
+    }
+
+    // The files are attached already; save the text fields without them
+    inputs.forEach(([input]) => { input.value = ''; });
+    status.textContent = 'Saving...';
+    form.submit();
+});
@@ -0,0 +1,19 @@
+// Dark mode is a purely client-side preference kept in localStorage; the
+// class on <html> is applied by the inline script in <head> before first paint
+function toggleDarkMode() {
+    const isDarkMode = document.documentElement.classList.toggle('dark-mode');
+    localStorage.setItem('darkMode', isDarkMode);
+    updateDarkModeToggle(isDarkMode);
+}
+
+// Update toggle button icon
+function updateDarkModeToggle(isDarkMode) {
+    const toggleBtn = document.querySelector('.dark-mode-toggle');
+    if (isDarkMode) {
+        toggleBtn.innerHTML = '🌙';
+    } else {
+        toggleBtn.innerHTML = '☀️';
+    }
+}
+
+updateDarkModeToggle(document.documentElement.classList.contains('dark-mode'));
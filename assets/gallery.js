@@ -0,0 +1,71 @@
+// Long galleries arrive in pages: when the end of a gallery comes within a
+// screen or so of the viewport, the next page is fetched and appended.
+// A failed fetch is retried after a growing delay, and given up after a few tries
+const MAX_PAGE_FAILURES = 3;
+const RETRY_DELAY_MS = 1000;
+
+function loadNextPage(gallery) {
+    const url = gallery.dataset.next;
+    if (!url || gallery.dataset.loading) {
+        return Promise.resolve();
+    }
+    gallery.dataset.loading = 'true';
+    return fetch(url)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => {
+            gallery.insertAdjacentHTML('beforeend', data.html);
+            delete gallery.dataset.failures;
+            if (data.next) {
+                gallery.dataset.next = data.next;
+            } else {
+                delete gallery.dataset.next;
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            const failures = Number(gallery.dataset.failures || 0) + 1;
+            if (failures >= MAX_PAGE_FAILURES) {
+                delete gallery.dataset.next;
+                return;
+            }
+            gallery.dataset.failures = failures;
+            // Resolve only after the delay, so callers do not refetch straight away
+            return new Promise(resolve => setTimeout(resolve, RETRY_DELAY_MS * 2 ** (failures - 1)));
+        })
+        .finally(() => {
+            delete gallery.dataset.loading;
+        });
+}
+
+document.querySelectorAll('.media-gallery[data-next]').forEach(gallery => {
+    if (!('IntersectionObserver' in window)) {
+        // Old browsers: fetch every page straight away
+        const loadAll = () => loadNextPage(gallery).then(() => gallery.dataset.next && loadAll());
+        loadAll();
+        return;
+    }
+    const sentinel = document.createElement('div');
+    sentinel.className = 'gallery-sentinel';
+    gallery.after(sentinel);
+    const observer = new IntersectionObserver(entries => {
+        if (!entries.some(entry => entry.isIntersecting)) {
+            return;
+        }
+        loadNextPage(gallery).then(() => {
+            if (!gallery.dataset.next) {
+                observer.disconnect();
+                sentinel.remove();
+            } else {
+                // Still in view after a short page: observe again to trigger the next fetch
+                observer.unobserve(sentinel);
+                observer.observe(sentinel);
+            }
+        });
+    }, {rootMargin: '0px 0px 800px 0px'});
+    observer.observe(sentinel);
+});
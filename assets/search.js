@@ -0,0 +1,92 @@
+// Search is answered by /api/search, which indexes names and guide text
+function escapeHtml(value) {
+    const div = document.createElement('div');
+    div.textContent = value;
+    return div.innerHTML;
+}
+
+function highlight(text, tokens) {
+    let html = escapeHtml(text);
+    tokens.forEach(token => {
+        const pattern = token.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+        html = html.replace(new RegExp(pattern, 'gi'), '<span class="search-highlight">$&</span>');
+    });
+    return html;
+}
+
+const searchUrl = document.getElementById('searchInput').dataset.searchUrl;
+let searchTimer = null;
+let searchController = null;
+
+document.getElementById('searchInput').addEventListener('input', function() {
+    const searchTerm = this.value.trim();
+    const resultsContainer = document.getElementById('searchResults');
+
+    clearTimeout(searchTimer);
+    if (searchTerm.length < 2) {
+        resultsContainer.style.display = 'none';
+        return;
+    }
+
+    // Wait for a pause in typing, and drop responses to superseded queries
+    searchTimer = setTimeout(() => {
+        if (searchController) {
+            searchController.abort();
+        }
+        searchController = new AbortController();
+
+        fetch(`${searchUrl}?q=${encodeURIComponent(searchTerm)}`, { signal: searchController.signal })
+            .then(response => response.json())
+            .then(data => {
+                const tokens = searchTerm.toLowerCase().split(/\s+/).filter(token => token.length >= 2);
+
+                if (data.results.length === 0) {
+                    resultsContainer.innerHTML = '<div class="search-result">No results found</div>';
+                    resultsContainer.style.display = 'block';
+                    return;
+                }
+
+                resultsContainer.innerHTML = '';
+
+                // Group by platform for better organization
+                const platformGroups = {};
+                data.results.forEach(result => {
+                    if (!platformGroups[result.platform]) {
+                        platformGroups[result.platform] = [];
+                    }
+                    platformGroups[result.platform].push(result);
+                });
+
+                for (const [platform, platformResults] of Object.entries(platformGroups)) {
+                    const platformHeader = document.createElement('div');
+                    platformHeader.className = 'search-result';
+                    platformHeader.innerHTML = `<strong>${highlight(platform, tokens)}</strong>`;
+                    resultsContainer.appendChild(platformHeader);
+
+                    platformResults.forEach(result => {
+                        const resultItem = document.createElement('div');
+                        resultItem.className = 'search-result';
+                        resultItem.innerHTML = `
+                            <a href="${escapeHtml(result.url)}">${highlight(result.label, tokens)}</a>
+                            <div>${highlight(result.snippet, tokens)}</div>`;
+                        resultsContainer.appendChild(resultItem);
+                    });
+                }
+
+                resultsContainer.style.display = 'block';
+            })
+            .catch(error => {
+                if (error.name !== 'AbortError') {
+                    console.error('Error:', error);
+                }
+            });
+    }, 150);
+});
+
+// Close search results when clicking elsewhere
+document.addEventListener('click', function(e) {
+    const searchContainer = document.querySelector('#search');
+    if (!searchContainer.contains(e.target)) {
+        document.getElementById('searchResults').style.display = 'none';
+    }
+});
@@ -0,0 +1,77 @@
+# Memory held by the parsed content in each worker, at 1x, 10x and 100x the current
+# catalogue (19 platforms x 4 actions), for the former frozen-dict representation
+# and the GuideEntry one. Every gunicorn worker holds one copy.
+#
+#   python benchmarks/bench_memory.py [--text-size N] [--media N] [--json]
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from types import MappingProxyType
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_content import BUILTIN_PLATFORMS, generate_content  # noqa: E402
+from content_store import freeze_content  # noqa: E402
+
+SCALES = (1, 10, 100)
+
+
+def freeze_dicts(value):
+    # The representation before GuideEntry: mapping proxies over dicts, lists as tuples
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze_dicts(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze_dicts(item) for item in value)
+    return value
+
+
+def measure(build, text):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    content = build(json.loads(text))
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del content
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--text-size', type=int, default=600, help='characters of text per guide')
+    parser.add_argument('--media', type=int, default=3, help='images per guide')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    for scale in SCALES:
+        extra_platforms = len(BUILTIN_PLATFORMS) * (scale - 1)
+        content = generate_content(extra_platforms, args.text_size, args.media)
+        # Guides share some uploads, as real content does
+        for index, actions in enumerate(content.values()):
+            for entry in actions.values():
+                entry['images'][0] = f'uploads/{index % 50:064x}.png'
+        text = json.dumps(content)
+        entries = sum(len(actions) for actions in content.values())
+        dicts = measure(freeze_dicts, text)
+        compact = measure(freeze_content, text)
+        results.append({'scale': scale, 'entries': entries, 'json_bytes': len(text),
+                        'frozen_dicts_bytes': dicts, 'guide_entries_bytes': compact})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'scale':>6}{'entries':>9}{'json':>12}{'dicts':>12}{'entries':>12}{'saved':>8}")
+    for r in results:
+        saved = 1 - r['guide_entries_bytes'] / r['frozen_dicts_bytes']
+        print(f"{r['scale']:>5}x{r['entries']:>9}{r['json_bytes'] / 1024:>9.0f} KB"
+              f"{r['frozen_dicts_bytes'] / 1024:>9.0f} KB{r['guide_entries_bytes'] / 1024:>9.0f} KB{saved:>8.0%}")
+
+
+if __name__ == '__main__':
+    main()
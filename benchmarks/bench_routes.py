@@ -0,0 +1,351 @@
+# Throughput and latency of the main routes, in-process through Flask's test client
+# and over HTTP against a local gunicorn.
+#
+#   python benchmarks/bench_routes.py --size medium --requests 500 --output results.json
+#   python benchmarks/bench_routes.py --target gunicorn --workers 4 --concurrency 16
+#   python benchmarks/bench_routes.py --baseline previous.json --output results.json
+#
+# With --baseline the run is compared against an earlier results file, and the
+# script exits 1 when p50/p99 latency or throughput regresses by more than --threshold.
+import argparse
+import http.client
+import io
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_content import PRESETS, generate_content, write_content  # noqa: E402
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+SCENARIOS = ('index', 'content_page', 'update_content', 'remove_media')
+PLATFORM = 'YouTube'
+ACTION = 'create_account'
+ADMIN_LOGIN = {'admin_user': 'AminArami', 'admin_pass': 'Am1680454481'}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, round(p / 100 * (len(sorted_values) - 1)))]
+
+
+def make_upload(seed, size):
+    # A distinct image per request, so content addressing never dedupes the write
+    if Image is not None:
+        side = max(8, int((size / 3) ** 0.5))
+        buffer = io.BytesIO()
+        Image.frombytes('RGB', (side, side), os.urandom(side * side * 3)).save(buffer, 'PNG', compress_level=1)
+        return buffer.getvalue()
+    return b'\x89PNG\r\n\x1a\n' + seed.to_bytes(8, 'big') + os.urandom(size)
+
+
+def multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, data) in files.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                     f'Content-Type: application/octet-stream\r\n\r\n'.encode() + data + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def build_requests(scenario, count, upload_size):
+    # (method, path, body, content type, needs admin) per request, built before timing starts
+    if scenario == 'index':
+        return [('GET', '/', None, None, False)] * count
+    if scenario == 'content_page':
+        return [('GET', f'/content/{PLATFORM}/{ACTION}', None, None, False)] * count
+    if scenario == 'update_content':
+        requests = []
+        for n in range(count):
+            body, content_type = multipart(
+                {'platform': PLATFORM, 'action_type': ACTION,
+                 'content_text': f'Benchmark edit {n}', 'additional_content': ''},
+                {'image_files': (f'bench{n}.png', make_upload(n, upload_size))})
+            requests.append(('POST', '/update_content', body, content_type, True))
+        return requests
+    if scenario == 'remove_media':
+        # Removes the images added by update_content, oldest first
+        body = json.dumps({'platform': PLATFORM, 'action': ACTION, 'media_type': 'image', 'index': 0}).encode()
+        return [('POST', '/remove_media', body, 'application/json', True)] * count
+    raise ValueError(scenario)
+
+
+def expected_status(scenario):
+    return 302 if scenario == 'update_content' else 200
+
+
+class ClientTarget:
+    """The app imported into this process and driven through Flask's test client."""
+
+    name = 'client'
+
+    def __init__(self, workdir):
+        os.chdir(workdir)
+        import mysite
+        self.app = mysite.app
+        # Cookies are sent by hand so flashed messages never pile up in the session
+        self.client = self.app.test_client(use_cookies=False)
+        response = self.client.post('/login', data=ADMIN_LOGIN)
+        self.admin_cookie = response.headers['Set-Cookie'].split(';', 1)[0]
+        self.media_tasks = mysite.media_tasks
+
+    def run(self, requests, concurrency):
+        latencies, statuses = [], []
+        start = time.perf_counter()
+        for method, path, body, content_type, admin in requests:
+            headers = {'Cookie': self.admin_cookie} if admin else {}
+            if content_type:
+                headers['Content-Type'] = content_type
+            t0 = time.perf_counter()
+            response = self.client.open(path, method=method, data=body, headers=headers)
+            response.get_data()
+            latencies.append(time.perf_counter() - t0)
+            statuses.append(response.status_code)
+        return latencies, statuses, time.perf_counter() - start
+
+    def settle(self):
+        self.media_tasks.wait()
+
+    def close(self):
+        self.settle()
+
+
+class GunicornTarget:
+    """A gunicorn server started on a free local port, driven over keep-alive connections."""
+
+    name = 'gunicorn'
+
+    def __init__(self, workdir, workers, threads):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            self.port = s.getsockname()[1]
+        env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', str(threads),
+             '--bind', f'127.0.0.1:{self.port}', '--log-level', 'warning', 'mysite:app'],
+            cwd=workdir, env=env)
+        self._wait_ready()
+
+        connection = self._connect()
+        connection.request('POST', '/login', body='admin_user={admin_user}&admin_pass={admin_pass}'.format(**ADMIN_LOGIN),
+                           headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        response = connection.getresponse()
+        response.read()
+        cookie = SimpleCookie(response.headers['Set-Cookie'])
+        self.admin_cookie = f"session={cookie['session'].value}"
+        connection.close()
+
+    def _connect(self):
+        return http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+
+    def _wait_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'gunicorn exited with status {self.process.returncode}')
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise RuntimeError('gunicorn did not start listening in time')
+
+    def run(self, requests, concurrency):
+        latencies, statuses = [], []
+        lock = threading.Lock()
+        pending = iter(requests)
+
+        def worker():
+            connection = self._connect()
+            try:
+                while True:
+                    with lock:
+                        item = next(pending, None)
+                    if item is None:
+                        return
+                    method, path, body, content_type, admin = item
+                    headers = {'Cookie': self.admin_cookie} if admin else {}
+                    if content_type:
+                        headers['Content-Type'] = content_type
+                    t0 = time.perf_counter()
+                    try:
+                        connection.request(method, path, body=body, headers=headers)
+                        response = connection.getresponse()
+                        response.read()
+                        status = response.status
+                    except (OSError, http.client.HTTPException):
+                        connection.close()
+                        connection = self._connect()
+                        status = 0
+                    elapsed = time.perf_counter() - t0
+                    with lock:
+                        latencies.append(elapsed)
+                        statuses.append(status)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, statuses, time.perf_counter() - start
+
+    def settle(self):
+        # Derivative jobs run inside the workers; give them a moment before the next scenario
+        time.sleep(0.5)
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait(timeout=30)
+
+
+def bench_scenario(target, scenario, args):
+    # The test client is sequential; writes are too, so remove_media never races
+    # past the images update_content added
+    concurrency = args.concurrency if target.name == 'gunicorn' and scenario in ('index', 'content_page') else 1
+    if args.warmup:
+        target.run(build_requests(scenario, args.warmup, args.upload_size), concurrency)
+    latencies, statuses, elapsed = target.run(build_requests(scenario, args.requests, args.upload_size), concurrency)
+    target.settle()
+
+    latencies.sort()
+    errors = sum(1 for status in statuses if status != expected_status(scenario))
+    return {
+        'target': target.name,
+        'scenario': scenario,
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3),
+    }
+
+
+def prepare_workdir(args):
+    workdir = tempfile.mkdtemp(prefix='bench_routes_')
+    platforms, text_size, media_items = PRESETS[args.size]
+    content = generate_content(platforms, text_size, media_items)
+    size = write_content(os.path.join(workdir, 'content.json'), content)
+    if os.environ.get('CONTENT_BACKEND') == 'sqlite':
+        from content_backends import migrate_json_to_sqlite
+        migrate_json_to_sqlite(os.path.join(workdir, 'content.json'), os.path.join(workdir, 'content.db'))
+    return workdir, size
+
+
+def run_metadata(args, content_size):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'content_backend': os.environ.get('CONTENT_BACKEND', 'json'),
+        'size': args.size,
+        'content_bytes': content_size,
+        'requests': args.requests,
+        'warmup': args.warmup,
+        'upload_size': args.upload_size,
+        'workers': args.workers,
+        'threads': args.threads,
+    }
+
+
+def compare(results, baseline, threshold):
+    previous = {(r['target'], r['scenario']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get((result['target'], result['scenario']))
+        if before is None:
+            continue
+        for key in ('p50_ms', 'p99_ms'):
+            if before[key] and result[key] > before[key] * (1 + threshold):
+                regressions.append(f"{result['target']}/{result['scenario']} {key}: {before[key]} -> {result[key]}")
+        if result['throughput_rps'] < before['throughput_rps'] * (1 - threshold):
+            regressions.append(f"{result['target']}/{result['scenario']} throughput_rps: "
+                               f"{before['throughput_rps']} -> {result['throughput_rps']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--target', choices=('client', 'gunicorn'), nargs='+', default=['client'])
+    parser.add_argument('--scenario', choices=SCENARIOS, nargs='+', default=list(SCENARIOS))
+    parser.add_argument('--size', choices=sorted(PRESETS), default='small')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=8, help='connections for the read scenarios (gunicorn)')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--upload-size', type=int, default=64 * 1024, help='approximate bytes per uploaded image')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='results JSON from an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15)
+    args = parser.parse_args()
+    if 'remove_media' in args.scenario and 'update_content' not in args.scenario:
+        parser.error('remove_media removes the images added by update_content; run both')
+
+    results = []
+    content_size = None
+    for target_name in args.target:
+        workdir, content_size = prepare_workdir(args)
+        if target_name == 'client':
+            target = ClientTarget(workdir)
+        else:
+            target = GunicornTarget(workdir, args.workers, args.threads)
+        try:
+            for scenario in SCENARIOS:
+                if scenario in args.scenario:
+                    results.append(bench_scenario(target, scenario, args))
+        finally:
+            target.close()
+
+    print(f"{'target':<10}{'scenario':<16}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for r in results:
+        print(f"{r['target']:<10}{r['scenario']:<16}{r['throughput_rps']:>10.1f}"
+              f"{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['errors']:>8}")
+
+    report = {'meta': run_metadata(args, content_size), 'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f'REGRESSION {line}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# Compares per-request render cost of compiling the page templates on every call
+# (render_template_string) against rendering the precompiled TEMPLATES registry.
+#
+#   python benchmarks/bench_templates.py [--iterations N]
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# mysite creates content.json and static/uploads relative to the working directory
+os.chdir(tempfile.mkdtemp(prefix='bench_templates_'))
+
+from flask import render_template, render_template_string  # noqa: E402
+
+import mysite  # noqa: E402
+
+
+def page_cases():
+    content = mysite.load_content()
+    # The index reads the grid from the catalogue jinja global
+    index_context = dict(content=content, login_error='')
+    page_context = dict(platform='YouTube', action='Create Account',
+                        platform_key='YouTube', action_key='create_account',
+                        content=content['YouTube']['create_account'])
+    return [
+        ('index', '/', mysite.HTML_TEMPLATE, index_context),
+        ('content_page', '/content/YouTube/create_account', mysite.CONTENT_PAGE_TEMPLATE, page_context),
+    ]
+
+
+def bench(iterations):
+    app = mysite.app
+    print(f"{'template':<14}{'compile per call':>20}{'precompiled':>16}{'speedup':>10}")
+    for name, path, source, context in page_cases():
+        with app.test_request_context(path):
+            before = timeit.timeit(lambda: render_template_string(source, **context), number=iterations)
+            after = timeit.timeit(lambda: render_template(mysite.TEMPLATES[name], **context), number=iterations)
+        before_us = before / iterations * 1e6
+        after_us = after / iterations * 1e6
+        print(f"{name:<14}{before_us:>17.1f} us{after_us:>13.1f} us{before_us / after_us:>9.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+    bench(args.iterations)
@@ -0,0 +1,96 @@
+# Synthetic content.json generators for the route benchmarks.
+#
+#   python benchmarks/synthetic_content.py large content.json
+#   python benchmarks/synthetic_content.py --platforms 60 --text-size 8000 --media 25 content.json
+#
+# Guides are generated for every built-in platform plus `platforms` extra ones. Only
+# the built-in platforms are listed on the index page; the extra ones still grow
+# content loads, saves and the search index, and have their own content pages.
+import argparse
+import json
+import os
+import random
+import sys
+
+# Copied from mysite.py so generating content does not import (and initialise) the app
+BUILTIN_PLATFORMS = [
+    'YouTube', 'TikTok', 'Instagram', 'Snapchat', 'Likee', 'Twitch',
+    'Telegram', 'WhatsApp', 'Signal', 'Messenger',
+    'TwitterX', 'Threads', 'Reddit', 'Pinterest',
+    'LinkedIn', 'Behance', 'DeviantArt', 'Spotify', 'SoundCloud',
+]
+ACTIONS = ['Create Account', 'Delete Account', 'Increase Followers', 'Prevent Hacking']
+
+# name -> (extra platforms, characters of text per guide, images/videos per guide)
+PRESETS = {
+    'small': (0, 200, 0),
+    'medium': (20, 2000, 5),
+    'large': (100, 10000, 25),
+}
+
+WORDS = ('account settings profile password security verify email phone privacy '
+         'followers content upload video photo channel message login recovery '
+         'notification backup device session token review report').split()
+
+
+def paragraph(rng, size):
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    text = ' '.join(words)
+    # Line breaks every ~400 characters, like hand-written guides
+    return '\n'.join(text[i:i + 400] for i in range(0, len(text), 400))
+
+
+def generate_content(platforms=0, text_size=200, media_items=0, seed=0):
+    rng = random.Random(seed)
+    names = BUILTIN_PLATFORMS + [f'Platform{n:03d}' for n in range(platforms)]
+    content = {}
+    for platform in names:
+        content[platform] = {}
+        for action in ACTIONS:
+            action_key = action.lower().replace(' ', '_')
+            content[platform][action_key] = {
+                'text': f"Guide for {action} on {platform}\n" + paragraph(rng, text_size),
+                'images': [f'https://media.example.com/{platform}/{action_key}/{n}.jpg'
+                           for n in range(media_items)],
+                'videos': [f'https://media.example.com/{platform}/{action_key}/{n}.mp4'
+                           for n in range(media_items // 5)],
+                'additional_content': paragraph(rng, text_size // 4),
+            }
+    return content
+
+
+def preset_content(name, seed=0):
+    platforms, text_size, media_items = PRESETS[name]
+    return generate_content(platforms, text_size, media_items, seed)
+
+
+def write_content(path, content):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(content, f, ensure_ascii=False, indent=4)
+    return os.path.getsize(path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('preset', nargs='?', choices=sorted(PRESETS))
+    parser.add_argument('output')
+    parser.add_argument('--platforms', type=int)
+    parser.add_argument('--text-size', type=int)
+    parser.add_argument('--media', type=int)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    platforms, text_size, media_items = PRESETS[args.preset or 'small']
+    if args.platforms is not None:
+        platforms = args.platforms
+    if args.text_size is not None:
+        text_size = args.text_size
+    if args.media is not None:
+        media_items = args.media
+    size = write_content(args.output, generate_content(platforms, text_size, media_items, args.seed))
+    print(f"Wrote {args.output} ({size / 1024:.0f} KiB)", file=sys.stderr)
@@ -0,0 +1,62 @@
+import sys
+import threading
+
+from flask import request, url_for
+
+
+def action_slug(name):
+    return sys.intern(name.lower().replace(' ', '_'))
+
+
+class Action:
+    __slots__ = ('key', 'name')
+
+    def __init__(self, name):
+        self.key = action_slug(name)
+        self.name = name
+
+
+class Category:
+    __slots__ = ('name', 'platforms')
+
+    def __init__(self, name, platforms):
+        self.name = name
+        self.platforms = tuple(sys.intern(platform) for platform in platforms)
+
+
+class Catalogue:
+    """The fixed grid of platforms and actions, with every derived string computed once.
+
+    Action keys ('create_account') and display names ('Create Account') are built at
+    startup, along with the lookup from key to action. Links into the grid are built
+    per endpoint the first time a page needs them and reused afterwards, so
+    templates never call url_for in their loops.
+    """
+
+    def __init__(self, platforms, actions):
+        self.categories = tuple(Category(name, members) for name, members in platforms.items())
+        self.actions = tuple(Action(name) for name in actions)
+        self.platforms = tuple(platform for category in self.categories for platform in category.platforms)
+        self.action_by_key = {action.key: action for action in self.actions}
+        self.action_names = {action.key: action.name for action in self.actions}
+        self._links = {}
+        self._lock = threading.Lock()
+
+    def action_name(self, action_key):
+        # Keys outside the catalogue (older content) fall back to a derived title
+        action = self.action_by_key.get(action_key)
+        return action.name if action else action_key.replace('_', ' ').title()
+
+    def links(self, endpoint):
+        # {platform: ((action, url), ...)} for an endpoint taking platform and action
+        key = (endpoint, request.script_root if request else '')
+        links = self._links.get(key)
+        if links is None:
+            links = {
+                platform: tuple((action, url_for(endpoint, platform=platform, action=action.key))
+                                for action in self.actions)
+                for platform in self.platforms
+            }
+            with self._lock:
+                self._links[key] = links
+        return links
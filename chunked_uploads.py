@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import secrets
+import time
+
+from content_backends import atomic_write
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent PUTs to one upload are not detected
+    fcntl = None
+
+CHUNK_SIZE = 64 * 1024
+UPLOAD_ID_LENGTH = 32
+
+
+class UploadError(ValueError):
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+class ChunkedUploads:
+    """Resumable uploads assembled from chunks under <storage root>/.partial.
+
+    An upload is created with its final size, then its bytes are appended by PUT
+    requests, each stating the offset it starts at. A chunk whose offset is not the
+    number of bytes received so far is rejected with that number, so a client that
+    lost a connection asks for the offset and carries on from there. Upload state
+    lives on disk, so any worker can take the next chunk and uploads survive
+    restarts. Once every byte has arrived, finalize() hashes the file and moves it
+    into the content-addressed store without copying it.
+    """
+
+    def __init__(self, storage, max_size, expire_after=24 * 60 * 60):
+        self.storage = storage
+        self.max_size = max_size
+        self.expire_after = expire_after
+        self.directory = os.path.join(storage.root, '.partial')
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _paths(self, upload_id):
+        if len(upload_id) != UPLOAD_ID_LENGTH or not all(c in '0123456789abcdef' for c in upload_id):
+            raise UploadError('Upload not found', 404)
+        base = os.path.join(self.directory, upload_id)
+        return base + '.json', base + '.part'
+
+    def create(self, filename, size, **attributes):
+        if size <= 0 or size > self.max_size:
+            raise UploadError(f'Uploads must be between 1 byte and {self.max_size} bytes', 413)
+        self.expire()
+        upload_id = secrets.token_hex(UPLOAD_ID_LENGTH // 2)
+        meta_path, part_path = self._paths(upload_id)
+        open(part_path, 'wb').close()
+        info = dict(attributes, filename=filename, size=size, created=time.time())
+        atomic_write(meta_path, json.dumps(info).encode('utf-8'))
+        return upload_id
+
+    def info(self, upload_id):
+        meta_path, part_path = self._paths(upload_id)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            info['received'] = os.path.getsize(part_path)
+        except (OSError, ValueError):
+            raise UploadError('Upload not found', 404)
+        info['upload_id'] = upload_id
+        return info
+
+    def write_chunk(self, upload_id, offset, stream):
+        info = self.info(upload_id)
+        _, part_path = self._paths(upload_id)
+        with open(part_path, 'ab') as f:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    raise UploadError('Another chunk of this upload is being written', 409)
+            received = os.fstat(f.fileno()).st_size
+            if offset != received:
+                raise UploadError('Chunk does not start at the received offset', 409, offset=received)
+
+            remaining = info['size'] - received
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if len(chunk) > remaining:
+                    f.truncate(received)
+                    raise UploadError('Chunk runs past the declared upload size', 413, offset=received)
+                f.write(chunk)
+                received += len(chunk)
+                remaining -= len(chunk)
+        return received
+
+    def finalize(self, upload_id, extension):
+        # Returns (media path, upload info); the upload's state files are removed
+        info = self.info(upload_id)
+        if info['received'] != info['size']:
+            raise UploadError('Upload is incomplete', 409, offset=info['received'])
+        meta_path, part_path = self._paths(upload_id)
+
+        digest = hashlib.sha256()
+        with open(part_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE * 16), b''):
+                digest.update(chunk)
+        media_path = self.storage.commit(part_path, digest.hexdigest(), extension)
+        os.remove(meta_path)
+        return media_path, info
+
+    def expire(self):
+        # Drop uploads nobody has written a chunk to for expire_after seconds
+        cutoff = time.time() - self.expire_after
+        for filename in os.listdir(self.directory):
+            upload_id, extension = os.path.splitext(filename)
+            if extension != '.json' or len(upload_id) != UPLOAD_ID_LENGTH:
+                continue
+            meta_path, part_path = self._paths(upload_id)
+            try:
+                if os.path.getmtime(part_path) >= cutoff:
+                    continue
+            except OSError:
+                pass
+            for path in (meta_path, part_path):
+                if os.path.exists(path):
+                    os.remove(path)
@@ -0,0 +1,209 @@
+import threading
+import zlib
+from collections import OrderedDict
+
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # in requirements.txt; without it only gzip is offered
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/css', 'text/javascript', 'text/plain', 'text/xml',
+    'application/javascript', 'application/json', 'application/xml', 'image/svg+xml',
+}
+
+
+def _gzip_compressor(level):
+    # wbits=31 writes a gzip header and trailer
+    return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+
+class _GzipStream:
+    def __init__(self, level):
+        self._compressor = _gzip_compressor(level)
+
+    def compress(self, chunk):
+        return self._compressor.compress(chunk)
+
+    def flush(self):
+        # Sync flush lets each streamed chunk reach the client immediately
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, chunk):
+        return self._compressor.process(chunk)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """WSGI middleware compressing text responses with brotli or gzip.
+
+    The encoding is negotiated from Accept-Encoding. Responses smaller than min_size,
+    already encoded, partial or not text-like pass through untouched. Buffered
+    responses that carry an ETag (cached pages) keep their compressed bytes in an
+    LRU keyed by (path, ETag, encoding), so the same page is compressed once rather than
+    on every hit. Responses without a Content-Length are compressed chunk by chunk
+    as they stream.
+
+    Compressed responses get an encoding-specific ETag ("<etag>-gzip"). If-None-Match
+    reaches the app with the bare tag added next to each suffixed one, so 304s keep
+    working, and a 304 matched that way is sent back with the suffixed tag. Tags
+    the app suffixed itself (precompressed asset bundles) still match as sent.
+    """
+
+    def __init__(self, app, min_size=500, gzip_level=6, brotli_quality=5, cache_size=256):
+        self.app = app
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _choose_encoding(self, environ):
+        accept = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and accept['br']:
+            return 'br'
+        if accept['gzip']:
+            return 'gzip'
+        return None
+
+    def _compress(self, body, encoding):
+        if encoding == 'br':
+            return brotli.compress(body, quality=self.brotli_quality)
+        compressor = _gzip_compressor(self.gzip_level)
+        return compressor.compress(body) + compressor.flush()
+
+    def _stream(self, encoding):
+        if encoding == 'br':
+            return _BrotliStream(self.brotli_quality)
+        return _GzipStream(self.gzip_level)
+
+    def _cached(self, key, body_factory, encoding):
+        with self._lock:
+            compressed = self._cache.get(key)
+            if compressed is not None:
+                self._cache.move_to_end(key)
+                return compressed
+        compressed = self._compress(body_factory(), encoding)
+        with self._lock:
+            self._cache[key] = compressed
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return compressed
+
+    @staticmethod
+    def _expand_if_none_match(environ):
+        # Returns {bare tag: tag as the client sent it} for the tags given an encoding suffix
+        value = environ.get('HTTP_IF_NONE_MATCH')
+        if not value:
+            return {}
+        tags = [tag.strip() for tag in value.split(',')]
+        bare = {}
+        for tag in tags:
+            for suffix in ('-gzip"', '-br"'):
+                if tag.endswith(suffix):
+                    bare.setdefault(tag[:-len(suffix)] + '"', tag)
+        if bare:
+            environ['HTTP_IF_NONE_MATCH'] = ', '.join(tags + [tag for tag in bare if tag not in tags])
+        return bare
+
+    @staticmethod
+    def _with_vary(response_headers, headers):
+        vary = [v.strip() for v in headers.get('vary', '').split(',') if v.strip()]
+        if 'accept-encoding' not in (v.lower() for v in vary):
+            vary.append('Accept-Encoding')
+        return response_headers + [('Vary', ', '.join(vary))]
+
+    def _should_compress(self, status, headers, environ):
+        if environ.get('REQUEST_METHOD') == 'HEAD' or not status.startswith('200'):
+            return False
+        content_type = headers.get('content-type', '').split(';')[0].strip().lower()
+        if content_type not in COMPRESSIBLE_TYPES:
+            return False
+        if 'content-encoding' in headers or 'no-transform' in headers.get('cache-control', ''):
+            return False
+        length = headers.get('content-length')
+        return length is None or int(length) >= self.min_size
+
+    def __call__(self, environ, start_response):
+        encoding = self._choose_encoding(environ)
+        if encoding is None:
+            return self.app(environ, start_response)
+        suffixed_tags = self._expand_if_none_match(environ)
+
+        captured = {}
+
+        def write(data):
+            raise RuntimeError('CompressionMiddleware does not support the WSGI write() callable')
+
+        def capture(status, response_headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = response_headers
+            captured['exc_info'] = exc_info
+            return write
+
+        app_iter = self.app(environ, capture)
+        status, response_headers = captured['status'], captured['headers']
+        headers = {name.lower(): value for name, value in response_headers}
+
+        if status.startswith('304') and headers.get('etag') in suffixed_tags:
+            # Matched through a tag this middleware suffixed; answer with that same tag
+            response_headers = self._with_vary(
+                [(name, value) for name, value in response_headers if name.lower() not in ('etag', 'vary')],
+                headers) + [('ETag', suffixed_tags[headers['etag']])]
+            start_response(status, response_headers, captured['exc_info'])
+            return app_iter
+
+        if not self._should_compress(status, headers, environ):
+            start_response(status, response_headers, captured['exc_info'])
+            return app_iter
+
+        new_headers = self._with_vary([(name, value) for name, value in response_headers
+                                       if name.lower() not in ('content-length', 'etag', 'vary')], headers)
+        new_headers.append(('Content-Encoding', encoding))
+        etag = headers.get('etag')
+        if etag:
+            new_headers.append(('ETag', etag[:-1] + f'-{encoding}"' if etag.endswith('"') else etag))
+
+        if 'content-length' in headers:
+            try:
+                if etag:
+                    key = (environ.get('PATH_INFO'), etag, encoding)
+                    compressed = self._cached(key, lambda: b''.join(app_iter), encoding)
+                else:
+                    compressed = self._compress(b''.join(app_iter), encoding)
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+            new_headers.append(('Content-Length', str(len(compressed))))
+            start_response(status, new_headers, captured['exc_info'])
+            return [compressed]
+
+        start_response(status, new_headers, captured['exc_info'])
+        return self._compress_stream(app_iter, encoding)
+
+    def _compress_stream(self, app_iter, encoding):
+        stream = self._stream(encoding)
+        try:
+            for chunk in app_iter:
+                if chunk:
+                    yield stream.compress(chunk) + stream.flush()
+            yield stream.finish()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
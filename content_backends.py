@@ -0,0 +1,336 @@
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads within one process are serialised
+    fcntl = None
+
+
+def atomic_write(path, data):
+    # Write to a temp file in the same directory, fsync it, then rename over the target
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    fsync_directory(directory)
+
+
+def fsync_directory(directory):
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class ContentBackend:
+    """Storage interface behind load_content()/save_entry().
+
+    load() returns the full {platform: {action: entry}} tree, or None when nothing
+    has been stored yet. version() must change whenever any worker writes, and is
+    checked on every request, so it has to be cheap.
+    """
+
+    def version(self):
+        raise NotImplementedError
+
+    def last_modified(self):
+        raise NotImplementedError
+
+    def load(self):
+        raise NotImplementedError
+
+    def save(self, content):
+        raise NotImplementedError
+
+    def update_entry(self, platform, action, entry, initial_content=None):
+        raise NotImplementedError
+
+
+class JsonFileBackend(ContentBackend):
+    """content.json plus an append-only journal of per-entry updates.
+
+    A single (platform, action) edit appends one line to the journal instead of
+    re-serialising the whole tree; the journal is folded back into content.json
+    once it grows past compact_after records. All writes hold an exclusive lock
+    on a sidecar lock file so gunicorn workers never interleave. If content.json
+    is unreadable, the journal is replayed over default_factory() instead.
+    """
+
+    def __init__(self, path, compact_after=50, default_factory=None):
+        self.path = path
+        self.default_factory = default_factory
+        self.journal_path = path + '.journal'
+        self.lock_path = path + '.lock'
+        self.compact_after = compact_after
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def _write_lock(self):
+        with self._thread_lock:
+            with open(self.lock_path, 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def version(self):
+        version = []
+        for path in (self.path, self.journal_path):
+            try:
+                st = os.stat(path)
+                version.append((st.st_mtime_ns, st.st_size, st.st_ino))
+            except OSError:
+                version.append(None)
+        if version[0] is None and version[1] is None:
+            return None
+        return tuple(version)
+
+    def last_modified(self):
+        # Seconds since the epoch of the latest write, or None if nothing was saved yet
+        mtimes = [item[0] for item in self.version() or () if item is not None]
+        return max(mtimes) / 1e9 if mtimes else None
+
+    def _read_journal(self):
+        records = []
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A torn record from a crashed writer was never acknowledged
+                        print(f"Skipping corrupt journal record in {self.journal_path}")
+        except FileNotFoundError:
+            pass
+        return records
+
+    def _read_base(self):
+        # Parsed content.json, or None when it is missing or unreadable
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error loading content: {e}")
+            return None
+
+    def load(self):
+        content = self._read_base()
+        records = self._read_journal()
+        if content is None and not records:
+            return None
+        if content is None:
+            content = self.default_factory() if self.default_factory else {}
+        for record in records:
+            content.setdefault(record['platform'], {})[record['action']] = record['entry']
+        return content
+
+    def _write_full(self, content):
+        data = json.dumps(content, indent=4, ensure_ascii=False).encode('utf-8')
+        atomic_write(self.path, data)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    def save(self, content):
+        with self._write_lock():
+            self._write_full(content)
+
+    def update_entry(self, platform, action, entry, initial_content=None):
+        # initial_content() supplies the full tree when content.json does not exist yet
+        record = json.dumps({'platform': platform, 'action': action, 'entry': entry},
+                            ensure_ascii=False)
+        with self._write_lock():
+            if not os.path.exists(self.path) and initial_content is not None:
+                content = initial_content()
+                content.setdefault(platform, {})[action] = entry
+                self._write_full(content)
+                return
+
+            with open(self.journal_path, 'a+b') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        f.write(b'\n')
+                f.write(record.encode('utf-8') + b'\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+            if len(self._read_journal()) >= self.compact_after:
+                self._write_full(self.load())
+
+
+class SqliteBackend(ContentBackend):
+    """Entries and their media lists in indexed SQLite tables, in WAL mode.
+
+    Readers in every worker proceed concurrently with a writer, and an edit only
+    rewrites the rows of one (platform, action). A generation counter in the meta
+    table is bumped by each write and serves as the version. Entry keys beyond the
+    text and media lists (such as 'mirrored_from') are kept as JSON in entries.extra.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            id INTEGER PRIMARY KEY,
+            platform TEXT NOT NULL,
+            action TEXT NOT NULL,
+            text TEXT NOT NULL DEFAULT '',
+            additional_content TEXT NOT NULL DEFAULT '',
+            extra TEXT,
+            UNIQUE (platform, action)
+        );
+        CREATE TABLE IF NOT EXISTS media (
+            entry_id INTEGER NOT NULL REFERENCES entries(id) ON DELETE CASCADE,
+            kind TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            PRIMARY KEY (entry_id, kind, position)
+        );
+        CREATE INDEX IF NOT EXISTS media_path ON media (path);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value
+        );
+        INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0), ('modified_at', NULL);
+    """
+
+    MEDIA_KINDS = (('images', 'image'), ('videos', 'video'))
+    COLUMN_KEYS = ('text', 'additional_content', 'images', 'videos')
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+            # Databases created before entries.extra existed
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(entries)')]
+            if 'extra' not in columns:
+                conn.execute('ALTER TABLE entries ADD COLUMN extra TEXT')
+
+    def _connect(self):
+        # One connection per thread, reopened after a fork (gunicorn --preload)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def version(self):
+        row = self._connect().execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row[0] or None
+
+    def last_modified(self):
+        row = self._connect().execute("SELECT value FROM meta WHERE key = 'modified_at'").fetchone()
+        return row[0]
+
+    def load(self):
+        conn = self._connect()
+        content = {}
+        entry_ids = {}
+        with conn:
+            # One read transaction so entries and media come from the same generation
+            conn.execute('BEGIN')
+            rows = conn.execute('SELECT id, platform, action, text, additional_content, extra FROM entries ORDER BY id')
+            for entry_id, platform, action, text, additional_content, extra in rows:
+                entry = {'text': text, 'images': [], 'videos': [], 'additional_content': additional_content}
+                if extra:
+                    entry.update(json.loads(extra))
+                content.setdefault(platform, {})[action] = entry
+                entry_ids[entry_id] = entry
+            if not entry_ids:
+                return None
+            for entry_id, kind, path in conn.execute('SELECT entry_id, kind, path FROM media ORDER BY entry_id, kind, position'):
+                entry_ids[entry_id][kind + 's'].append(path)
+        return content
+
+    def _write_entry(self, conn, platform, action, entry):
+        extra = {key: value for key, value in entry.items() if key not in self.COLUMN_KEYS}
+        conn.execute(
+            'INSERT INTO entries (platform, action, text, additional_content, extra) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (platform, action) DO UPDATE SET text = excluded.text, '
+            'additional_content = excluded.additional_content, extra = excluded.extra',
+            (platform, action, entry.get('text', ''), entry.get('additional_content', ''),
+             json.dumps(extra, ensure_ascii=False) if extra else None))
+        entry_id = conn.execute('SELECT id FROM entries WHERE platform = ? AND action = ?',
+                                (platform, action)).fetchone()[0]
+        conn.execute('DELETE FROM media WHERE entry_id = ?', (entry_id,))
+        conn.executemany(
+            'INSERT INTO media (entry_id, kind, position, path) VALUES (?, ?, ?, ?)',
+            [(entry_id, kind, position, path)
+             for key, kind in self.MEDIA_KINDS
+             for position, path in enumerate(entry.get(key, []))])
+
+    def _bump_generation(self, conn):
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+        conn.execute("UPDATE meta SET value = ? WHERE key = 'modified_at'", (time.time(),))
+
+    def save(self, content):
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM media')
+            conn.execute('DELETE FROM entries')
+            for platform, actions in content.items():
+                for action, entry in actions.items():
+                    self._write_entry(conn, platform, action, entry)
+            self._bump_generation(conn)
+
+    def update_entry(self, platform, action, entry, initial_content=None):
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            empty = conn.execute('SELECT 1 FROM entries LIMIT 1').fetchone() is None
+            if empty and initial_content is not None:
+                content = initial_content()
+                content.setdefault(platform, {})[action] = entry
+                for content_platform, actions in content.items():
+                    for content_action, content_entry in actions.items():
+                        self._write_entry(conn, content_platform, content_action, content_entry)
+            else:
+                self._write_entry(conn, platform, action, entry)
+            self._bump_generation(conn)
+
+
+def migrate_json_to_sqlite(json_path, db_path):
+    content = JsonFileBackend(json_path).load()
+    if content is None:
+        raise ValueError(f"No content found in {json_path}")
+    SqliteBackend(db_path).save(content)
+    return sum(len(actions) for actions in content.values())
+
+
+if __name__ == '__main__':
+    # One-shot migration: python content_backends.py content.json content.db
+    if len(sys.argv) != 3:
+        print(f"Usage: {sys.argv[0]} <content.json> <content.db>")
+        sys.exit(1)
+    count = migrate_json_to_sqlite(sys.argv[1], sys.argv[2])
+    print(f"Migrated {count} entries from {sys.argv[1]} to {sys.argv[2]}")
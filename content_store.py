@@ -0,0 +1,150 @@
+import sys
+import threading
+from types import MappingProxyType
+
+
+class GuideEntry:
+    """Immutable in-memory form of one guide (one platform/action).
+
+    Uses __slots__ instead of a per-entry dict, keeps media lists as tuples
+    (paths repeated across guides share one string, see freeze_content) and leaves
+    entry['text'] / entry.get('images') working, so templates, search and
+    media_storage read it exactly like the JSON dict it was built from. Keys
+    outside the known four are kept in `extra`, so thaw() round-trips them.
+    """
+
+    __slots__ = ('text', 'additional_content', 'images', 'videos', 'extra')
+    FIELDS = ('text', 'additional_content', 'images', 'videos')
+
+    def __init__(self, text='', additional_content='', images=(), videos=(), extra=None):
+        object.__setattr__(self, 'text', text)
+        object.__setattr__(self, 'additional_content', additional_content)
+        object.__setattr__(self, 'images', tuple(images))
+        object.__setattr__(self, 'videos', tuple(videos))
+        object.__setattr__(self, 'extra', extra)
+
+    @classmethod
+    def from_dict(cls, entry, strings=None):
+        # strings: {path: path} memo shared across entries so repeated media paths are stored once
+        if strings is None:
+            strings = {}
+        extra = {key: freeze(value) for key, value in entry.items() if key not in cls.FIELDS}
+        return cls(entry.get('text', ''), entry.get('additional_content', ''),
+                   [strings.setdefault(path, path) for path in entry.get('images', ())],
+                   [strings.setdefault(path, path) for path in entry.get('videos', ())],
+                   MappingProxyType(extra) if extra else None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('GuideEntry is immutable; thaw() it to edit')
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in self.FIELDS or (self.extra is not None and key in self.extra)
+
+    def keys(self):
+        return list(self.FIELDS) + (list(self.extra) if self.extra else [])
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.FIELDS) + (len(self.extra) if self.extra else 0)
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def __eq__(self, other):
+        return isinstance(other, GuideEntry) and self.items() == other.items()
+
+    def __hash__(self):
+        return hash((self.text, self.images, self.videos))
+
+
+def freeze_content(content):
+    # {platform: {action: entry}} -> read-only mappings of GuideEntry with interned keys.
+    # Platform and action names are few and looked up constantly, so they are interned;
+    # media paths are only deduplicated within this tree, which leaves the
+    # process-wide intern table alone
+    strings = {}
+    return MappingProxyType({
+        sys.intern(platform): MappingProxyType({
+            sys.intern(action): GuideEntry.from_dict(entry, strings) for action, entry in actions.items()
+        })
+        for platform, actions in content.items()
+    })
+
+
+def freeze(value):
+    # Read-only view of a parsed JSON tree: dicts become mapping proxies, lists become tuples
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    # Mutable deep copy of a frozen tree, for handlers that edit and save content
+    if isinstance(value, (dict, MappingProxyType, GuideEntry)):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+class ContentStore:
+    """Keeps the parsed content in memory and re-reads it only when the backend changes.
+
+    Every worker process has its own store; the backend's version (file mtime, size and
+    inode) is checked on each access so edits saved by another worker are picked up on
+    the next request.
+    """
+
+    def __init__(self, backend, default_factory):
+        self.backend = backend
+        self.default_factory = default_factory
+        self._lock = threading.Lock()
+        # (file version, frozen content), swapped as a single reference
+        self._snapshot = None
+
+    def _read(self):
+        content = self.backend.load()
+        return content if content is not None else self.default_factory()
+
+    def snapshot(self):
+        # Returns (version, content) where content is the tree as of that version
+        version = self.backend.version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot[0] == version:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is None or self._snapshot[0] != version:
+                self._snapshot = (version, freeze_content(self._read()))
+            return self._snapshot
+
+    def get(self):
+        return self.snapshot()[1]
+
+    def get_mutable(self):
+        return thaw(self.get())
+
+    @property
+    def version(self):
+        return self.snapshot()[0]
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
@@ -0,0 +1,210 @@
+import json
+import mimetypes
+import os
+import shutil
+import subprocess
+
+from content_backends import atomic_write
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; pages fall back to the original image
+    Image = None
+
+# Posters and transcodes need ffmpeg/ffprobe on PATH; without them videos are served as uploaded
+FFMPEG = shutil.which('ffmpeg')
+FFPROBE = shutil.which('ffprobe')
+POSTER_WIDTH = 1280
+# Height of the lower-bitrate H.264 rendition; 0 disables it
+VIDEO_RENDITION_HEIGHT = int(os.environ.get('VIDEO_RENDITION_HEIGHT', 480))
+VIDEO_CRF = 28
+POSTER_TIMEOUT = 60
+TRANSCODE_TIMEOUT = 60 * 60
+
+# Widths of the resized copies; originals narrower than a width are not upscaled
+DERIVATIVE_WIDTHS = (320, 640, 1280)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+# Touched whenever a job finishes, so cached pages that embed srcsets are re-rendered
+MARKER_FILE = '.derivatives'
+
+_info_cache = {}
+
+
+def stem(media_path):
+    return os.path.splitext(os.path.basename(media_path))[0]
+
+
+def sidecar_path(storage, media_path):
+    return os.path.join(storage.root, stem(media_path) + '.json')
+
+
+def version(storage):
+    try:
+        return os.stat(os.path.join(storage.root, MARKER_FILE)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def mark_updated(storage):
+    with open(os.path.join(storage.root, MARKER_FILE), 'a'):
+        pass
+    os.utime(os.path.join(storage.root, MARKER_FILE))
+
+
+def read_info(storage, media_path):
+    # Metadata written next to the blob: size, derivatives and (for videos) poster/mime
+    info = _info_cache.get(media_path)
+    if info is not None:
+        return info
+    try:
+        with open(sidecar_path(storage, media_path), 'r', encoding='utf-8') as f:
+            info = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    # Blobs are content-addressed, so their metadata never changes once complete
+    if not info.get('pending'):
+        _info_cache[media_path] = info
+    return info
+
+
+def write_info(storage, media_path, info):
+    atomic_write(sidecar_path(storage, media_path),
+                 json.dumps(info, ensure_ascii=False).encode('utf-8'))
+    _info_cache.pop(media_path, None)
+
+
+def forget(media_path):
+    _info_cache.pop(media_path, None)
+
+
+def generate_image_derivatives(storage, media_path):
+    if Image is None or os.path.exists(sidecar_path(storage, media_path)):
+        return
+    source = storage.file_path(media_path)
+    base = stem(media_path)
+
+    with Image.open(source) as original:
+        width, height = original.size
+        info = {'width': width, 'height': height, 'webp': [], 'jpeg': []}
+
+        # Animated GIFs are left as they are; only their dimensions are recorded
+        if not getattr(original, 'is_animated', False):
+            image = ImageOps.exif_transpose(original)
+            width, height = image.size
+            info.update(width=width, height=height)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+            for target_width in [w for w in DERIVATIVE_WIDTHS if w < width] + [width]:
+                target_height = max(1, round(height * target_width / width))
+                resized = image if target_width == width else image.resize((target_width, target_height), Image.LANCZOS)
+
+                webp_name = f"{base}.w{target_width}.webp"
+                resized.save(os.path.join(storage.root, webp_name), 'WEBP', quality=WEBP_QUALITY, method=4)
+                info['webp'].append([target_width, webp_name])
+
+                if target_width != width:
+                    jpeg_name = f"{base}.w{target_width}.jpg"
+                    resized.convert('RGB').save(os.path.join(storage.root, jpeg_name), 'JPEG',
+                                                quality=JPEG_QUALITY, optimize=True, progressive=True)
+                    info['jpeg'].append([target_width, jpeg_name])
+
+    write_info(storage, media_path, info)
+    mark_updated(storage)
+
+
+def video_mimetype(media_path):
+    # Uploaded .webm/.ogg files must not be announced as video/mp4
+    path = media_path.split('?', 1)[0]
+    if path.lower().endswith('.ogg'):
+        return 'video/ogg'
+    return mimetypes.guess_type(path)[0] or 'video/mp4'
+
+
+def _probe(source):
+    result = subprocess.run(
+        [FFPROBE, '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'stream=width,height:format=duration',
+         '-of', 'json', source],
+        capture_output=True, text=True, check=True, timeout=POSTER_TIMEOUT)
+    data = json.loads(result.stdout)
+    stream = (data.get('streams') or [{}])[0]
+    duration = float(data.get('format', {}).get('duration') or 0)
+    return stream.get('width'), stream.get('height'), duration
+
+
+def _ffmpeg(args, output, timeout):
+    # ffmpeg writes a hidden temp file that is renamed into place once complete
+    directory, name = os.path.split(output)
+    tmp_path = os.path.join(directory, '.' + name)
+    try:
+        subprocess.run([FFMPEG, '-nostdin', '-y', '-loglevel', 'error'] + args + [tmp_path],
+                       capture_output=True, check=True, timeout=timeout)
+        os.replace(tmp_path, output)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def generate_video_derivatives(storage, media_path):
+    if FFMPEG is None or FFPROBE is None:
+        return
+    existing = read_info(storage, media_path)
+    if existing is not None and not existing.get('pending'):
+        return
+    source = storage.file_path(media_path)
+    base = stem(media_path)
+    width, height, duration = _probe(source)
+    info = {'mime': video_mimetype(media_path), 'width': width, 'height': height,
+            'duration': duration, 'poster': None, 'renditions': []}
+
+    # A frame a second in (or halfway through shorter clips) rather than a black first frame
+    poster_name = f"{base}.poster.jpg"
+    _ffmpeg(['-ss', str(min(1.0, duration / 2)), '-i', source, '-frames:v', '1',
+             '-vf', f"scale='min({POSTER_WIDTH},iw)':-2", '-q:v', '4'],
+            os.path.join(storage.root, poster_name), POSTER_TIMEOUT)
+    info['poster'] = poster_name
+
+    if VIDEO_RENDITION_HEIGHT and height and height > VIDEO_RENDITION_HEIGHT:
+        # The poster is usable before the (much slower) transcode finishes
+        write_info(storage, media_path, dict(info, pending=True))
+        mark_updated(storage)
+        rendition_name = f"{base}.{VIDEO_RENDITION_HEIGHT}p.mp4"
+        _ffmpeg(['-i', source, '-vf', f'scale=-2:{VIDEO_RENDITION_HEIGHT}',
+                 '-c:v', 'libx264', '-preset', 'medium', '-crf', str(VIDEO_CRF), '-pix_fmt', 'yuv420p',
+                 '-c:a', 'aac', '-b:a', '96k', '-movflags', '+faststart'],
+                os.path.join(storage.root, rendition_name), TRANSCODE_TIMEOUT)
+        info['renditions'].append([VIDEO_RENDITION_HEIGHT, rendition_name, 'video/mp4'])
+    write_info(storage, media_path, info)
+    mark_updated(storage)
+
+
+def derivative_names(info):
+    # Files a sidecar points at: image widths, the video poster and renditions
+    names = [name for _, name in info.get('webp', []) + info.get('jpeg', [])]
+    names += [rendition[1] for rendition in info.get('renditions', [])]
+    if info.get('poster'):
+        names.append(info['poster'])
+    return names
+
+
+def remove_derivatives(storage, media_path):
+    # Derivatives are named after the blob's stem, so identical bytes stored under
+    # another extension (<sha>.jpg and <sha>.jpeg) share them; those are kept until
+    # the last such blob goes
+    info = read_info(storage, media_path)
+    forget(media_path)
+    original = os.path.basename(media_path)
+    sidecar = os.path.basename(sidecar_path(storage, media_path))
+    # Blobs are <sha>.<ext>; derivatives carry a second suffix (<sha>.w320.webp)
+    siblings = [name for name in os.listdir(storage.root)
+                if name.startswith(stem(media_path) + '.') and name.count('.') == 1
+                and name not in (original, sidecar)]
+    if siblings:
+        return
+    for name in derivative_names(info or {}) + [sidecar]:
+        try:
+            os.remove(os.path.join(storage.root, name))
+        except FileNotFoundError:
+            pass
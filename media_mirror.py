@@ -0,0 +1,181 @@
+import http.client
+import ipaddress
+import mimetypes
+import os
+import socket
+import threading
+from collections import defaultdict
+from urllib.parse import urljoin, urlsplit
+
+# Extensions for the content types mimetypes maps oddly (or not at all)
+EXTENSIONS = {'image/jpeg': 'jpg', 'video/ogg': 'ogg', 'video/quicktime': 'mov'}
+MAX_REDIRECTS = 3
+
+
+class MirrorError(Exception):
+    pass
+
+
+def _public_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None):
+    # socket.create_connection() that refuses hosts resolving to loopback, link-local
+    # or private addresses. The check runs on the addresses actually connected to,
+    # so neither a redirect nor a DNS answer can point the mirror at internal services
+    host, port = address
+    addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    for _, _, _, _, sockaddr in addresses:
+        ip = ipaddress.ip_address(sockaddr[0])
+        if getattr(ip, 'ipv4_mapped', None):
+            ip = ip.ipv4_mapped
+        if not ip.is_global:
+            raise MirrorError(f'{host} resolves to a non-public address ({ip})')
+    error = None
+    for family, socktype, proto, _, sockaddr in addresses:
+        sock = socket.socket(family, socktype, proto)
+        try:
+            if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as e:
+            sock.close()
+            error = e
+    raise error
+
+
+class _LimitedReader:
+    # Lets MediaStorage.store() stream a response while enforcing the size limit
+    def __init__(self, response, max_bytes):
+        self._response = response
+        self._remaining = max_bytes
+
+    def read(self, size):
+        chunk = self._response.read(size)
+        self._remaining -= len(chunk)
+        if self._remaining < 0:
+            raise MirrorError('Remote file is larger than the mirror size limit')
+        return chunk
+
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections, reused per (scheme, host, port).
+
+    At most max_per_host requests run against one host at a time, so a guide with
+    dozens of images from one CDN does not open dozens of connections to it.
+    Connections to non-public addresses are refused unless allow_private is set.
+    """
+
+    def __init__(self, timeout, max_per_host=2, allow_private=False):
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.allow_private = allow_private
+        self._lock = threading.Lock()
+        self._idle = defaultdict(list)
+        self._slots = defaultdict(lambda: threading.BoundedSemaphore(self.max_per_host))
+
+    def _new(self, scheme, host, port):
+        if scheme == 'https':
+            connection = http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        else:
+            connection = http.client.HTTPConnection(host, port, timeout=self.timeout)
+        if not self.allow_private:
+            connection._create_connection = _public_connection
+        return connection
+
+    def acquire(self, scheme, host, port):
+        key = (scheme, host, port)
+        with self._lock:
+            slot = self._slots[key]
+        slot.acquire()
+        with self._lock:
+            idle = self._idle[key]
+            connection = idle.pop() if idle else None
+        return connection or self._new(scheme, host, port)
+
+    def release(self, scheme, host, port, connection, reusable):
+        key = (scheme, host, port)
+        if reusable:
+            with self._lock:
+                self._idle[key].append(connection)
+        else:
+            connection.close()
+        self._slots[key].release()
+
+    def close(self):
+        with self._lock:
+            for connections in self._idle.values():
+                for connection in connections:
+                    connection.close()
+            self._idle.clear()
+
+
+class MediaMirror:
+    """Downloads remote images/videos into MediaStorage so pages stop hot-linking them.
+
+    Runs inside the background task queue; each fetch has a connect/read timeout,
+    a size cap and a content-type check, and goes through a shared ConnectionPool.
+    Hosts on loopback, link-local or private networks are refused (redirects
+    included) unless allow_private is set, e.g. for a local stand-in server.
+    fetch() returns the local media path ('uploads/<sha256>.<ext>').
+    """
+
+    def __init__(self, storage, allowed_extensions, timeout=10, max_bytes=200 * 1024 * 1024, max_per_host=2,
+                 allow_private=False):
+        self.storage = storage
+        self.allowed_extensions = allowed_extensions
+        self.max_bytes = max_bytes
+        self.pool = ConnectionPool(timeout, max_per_host, allow_private)
+
+    def _extension(self, url, content_type, media_type):
+        content_type = content_type.split(';')[0].strip().lower()
+        if not content_type.startswith(media_type + '/'):
+            raise MirrorError(f'{url} has content type {content_type or "(none)"}, expected {media_type}/*')
+        extension = EXTENSIONS.get(content_type) or (mimetypes.guess_extension(content_type) or '').lstrip('.')
+        if extension not in self.allowed_extensions[media_type]:
+            # Some servers send a generic subtype; trust the URL's extension instead
+            extension = os.path.splitext(urlsplit(url).path)[1].lstrip('.').lower()
+        if extension not in self.allowed_extensions[media_type]:
+            raise MirrorError(f'{url} has an unsupported type ({content_type})')
+        return extension
+
+    def fetch(self, url, media_type):
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            if parts.scheme not in ('http', 'https') or not parts.hostname:
+                raise MirrorError(f'Cannot mirror {url}')
+            port = parts.port or (443 if parts.scheme == 'https' else 80)
+            target = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+            address = (parts.scheme, parts.hostname, port)
+
+            connection = self.pool.acquire(*address)
+            reusable = False
+            try:
+                headers = {'Accept': f'{media_type}/*'}
+                try:
+                    connection.request('GET', target, headers=headers)
+                    response = connection.getresponse()
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    # The server closed this pooled connection while it sat idle
+                    connection.close()
+                    connection.request('GET', target, headers=headers)
+                    response = connection.getresponse()
+                if response.status in (301, 302, 303, 307, 308) and response.getheader('Location'):
+                    response.read()
+                    reusable = not response.will_close
+                    url = urljoin(url, response.getheader('Location'))
+                    continue
+                if response.status != 200:
+                    raise MirrorError(f'{url} returned {response.status}')
+                length = response.getheader('Content-Length')
+                if length and int(length) > self.max_bytes:
+                    raise MirrorError(f'{url} is larger than the mirror size limit')
+                extension = self._extension(url, response.getheader('Content-Type', ''), media_type)
+                media_path = self.storage.store(_LimitedReader(response, self.max_bytes), extension)
+                reusable = not response.will_close
+                return media_path
+            except (OSError, http.client.HTTPException) as e:
+                raise MirrorError(f'Fetching {url} failed: {e}')
+            finally:
+                self.pool.release(*address, connection, reusable)
+        raise MirrorError(f'Too many redirects for {url}')
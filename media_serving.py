@@ -0,0 +1,159 @@
+import mimetypes
+import os
+import re
+import secrets
+from datetime import datetime, timezone
+
+from flask import abort, current_app, request, send_file
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.http import is_resource_modified, parse_range_header
+from werkzeug.security import safe_join
+
+# <sha256>.<ext> blobs and their <sha256>.<suffix>.<ext> derivatives never change
+CONTENT_ADDRESSED_RE = re.compile(r'^[0-9a-f]{64}(\.[A-Za-z0-9]+)+$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+DEFAULT_MAX_AGE = 60 * 60
+
+# More ranges than this (or overlapping ones) get the whole file instead
+MAX_RANGES = 16
+CHUNK_SIZE = 256 * 1024
+
+
+def is_content_addressed(filename):
+    return CONTENT_ADDRESSED_RE.match(filename) is not None
+
+
+def _requested_ranges():
+    # (start, stop) pairs from a bytes Range header, parsed part by part because
+    # Werkzeug rejects the whole header when parts overlap; None without one
+    units, _, spec = request.headers.get('Range', '').partition('=')
+    if units.strip() != 'bytes':
+        return None
+    parsed = [parse_range_header(f'bytes={part.strip()}') for part in spec.split(',')]
+    if any(part is None for part in parsed):
+        return None
+    return [part.ranges[0] for part in parsed]
+
+
+def _satisfiable_ranges(requested, size):
+    # Sorted absolute (start, stop) byte ranges that fall inside the file
+    ranges = []
+    for start, stop in requested:
+        if start < 0:
+            start, stop = max(size + start, 0), size
+        elif stop is None or stop > size:
+            stop = size
+        if start < stop:
+            ranges.append((start, stop))
+    ranges.sort()
+    return ranges
+
+
+def _range_environ(requested, ranges):
+    # The environ send_file's range handling should see. Werkzeug answers only
+    # single, non-overlapping ranges (anything else gets a 416), so multi-range
+    # requests are narrowed here: one satisfiable part becomes a plain single
+    # range, and too many or overlapping parts drop the header to send the
+    # whole file.
+    environ = request.environ
+    if requested is None or len(requested) < 2:
+        return environ
+    if len(ranges) > MAX_RANGES or any(a[1] > b[0] for a, b in zip(ranges, ranges[1:])):
+        environ = dict(environ)
+        del environ['HTTP_RANGE']
+    elif len(ranges) == 1:
+        start, stop = ranges[0]
+        environ = dict(environ, HTTP_RANGE=f'bytes={start}-{stop - 1}')
+    return environ
+
+
+def _multipart_ranges_response(path, ranges, size, mimetype, etag):
+    boundary = secrets.token_hex(16)
+    headers = [
+        (f"\r\n--{boundary}\r\nContent-Type: {mimetype}\r\n"
+         f"Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n").encode('ascii')
+        for start, stop in ranges
+    ]
+    closing = f"\r\n--{boundary}--\r\n".encode('ascii')
+    length = sum(len(part) for part in headers) + sum(stop - start for start, stop in ranges) + len(closing)
+
+    def generate():
+        with open(path, 'rb') as f:
+            for part_header, (start, stop) in zip(headers, ranges):
+                yield part_header
+                f.seek(start)
+                remaining = stop - start
+                while remaining:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+        yield closing
+
+    response = current_app.response_class(generate(), status=206,
+                                          mimetype=f'multipart/byteranges; boundary={boundary}')
+    response.content_length = length
+    response.set_etag(etag)
+    return response
+
+
+def send_media(directory, filename, accel_prefix=None):
+    """Serve an uploaded file with range support and long-lived caching for blobs.
+
+    With accel_prefix (e.g. '/_uploads/') the body is left to the front-end proxy
+    through X-Accel-Redirect, so the worker returns immediately; nginx needs a
+    matching `internal` location aliased to the upload folder. Flask's
+    USE_X_SENDFILE is honoured as well. Otherwise single ranges go through
+    send_file (which uses the server's sendfile-backed file wrapper for full
+    responses) and multiple ranges are answered as multipart/byteranges.
+    Overlapping ranges, or more than MAX_RANGES, get the whole file.
+    If-None-Match and If-Modified-Since are answered before any Range header
+    is looked at, as RFC 9110 orders them.
+    """
+    path = safe_join(os.path.abspath(directory), filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    st = os.stat(path)
+    immutable = is_content_addressed(filename)
+    etag = filename if immutable else f"{st.st_mtime_ns:x}-{st.st_size:x}"
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    max_age = IMMUTABLE_MAX_AGE if immutable else DEFAULT_MAX_AGE
+
+    if accel_prefix:
+        response = current_app.response_class(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + filename
+        response.set_etag(etag)
+    elif not is_resource_modified(request.environ, etag=etag,
+                                  last_modified=datetime.fromtimestamp(st.st_mtime, timezone.utc)):
+        # Werkzeug would serve a satisfiable range first, so the 304 is decided here
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        response.last_modified = st.st_mtime
+    else:
+        requested = _requested_ranges()
+        ranges = _satisfiable_ranges(requested or (), st.st_size)
+        environ = _range_environ(requested, ranges)
+        if_range = request.headers.get('If-Range')
+        if (environ is request.environ and ranges and len(ranges) > 1
+                and (if_range is None or if_range.strip('"') == etag)):
+            response = _multipart_ranges_response(path, ranges, st.st_size, mimetype, etag)
+        else:
+            response = send_file(path, mimetype=mimetype, conditional=False, etag=etag,
+                                 last_modified=st.st_mtime, max_age=max_age)
+            try:
+                response = response.make_conditional(environ, accept_ranges=True, complete_length=st.st_size)
+            except RequestedRangeNotSatisfiable:
+                response.close()
+                raise
+            if response.status_code == 304:
+                response.headers.pop('X-Sendfile', None)
+
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if immutable:
+        response.cache_control.immutable = True
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
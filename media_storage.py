@@ -0,0 +1,76 @@
+import hashlib
+import os
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+
+
+class MediaStorage:
+    """Content-addressed blob store for uploaded media.
+
+    Files are streamed to disk in chunks while their SHA-256 is computed and are
+    stored as <sha256>.<ext>, so the same file uploaded to several guides is kept
+    once. Content entries reference blobs as 'uploads/<sha256>.<ext>'; a blob is
+    only deleted once no entry references it any more.
+    """
+
+    def __init__(self, root, url_prefix='uploads'):
+        self.root = root
+        self.url_prefix = url_prefix
+        os.makedirs(root, exist_ok=True)
+
+    def media_path(self, filename):
+        return f"{self.url_prefix}/{filename}"
+
+    def file_path(self, media_path):
+        return os.path.join(self.root, os.path.basename(media_path))
+
+    def store(self, stream, extension):
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(prefix='.upload-', dir=self.root)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    f.write(chunk)
+            return self.commit(tmp_path, digest.hexdigest(), extension)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def commit(self, tmp_path, sha256, extension):
+        # Move a fully written temp file into place under its content hash
+        filename = f"{sha256}.{extension.lower()}"
+        final_path = os.path.join(self.root, filename)
+        if os.path.exists(final_path):
+            # Already stored by an earlier upload of the same bytes
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, final_path)
+        return self.media_path(filename)
+
+    def store_upload(self, file_storage):
+        extension = file_storage.filename.rsplit('.', 1)[1]
+        return self.store(file_storage.stream, extension)
+
+    @staticmethod
+    def is_referenced(content, media_path):
+        for actions in content.values():
+            for entry in actions.values():
+                if media_path in entry.get('images', ()) or media_path in entry.get('videos', ()):
+                    return True
+        return False
+
+    def release(self, content, media_path):
+        # Unlink a local blob once the saved content no longer references it
+        if not media_path or media_path.startswith('http') or self.is_referenced(content, media_path):
+            return False
+        file_path = self.file_path(media_path)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+            return True
+        return False
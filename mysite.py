@@ -1,21 +1,100 @@
+import gc
 import os
-from flask import Flask, render_template_string, request, redirect, url_for, session, flash, send_from_directory, jsonify
+import sys
+import hashlib
+from flask import Flask, render_template, stream_template, request, redirect, url_for, session, flash, get_flashed_messages, jsonify, make_response, g, abort, has_request_context
 import json
-from datetime import datetime
-from werkzeug.utils import secure_filename
+import threading
+import time
+from datetime import datetime, timezone
+from werkzeug.http import is_resource_modified
+from content_backends import JsonFileBackend, SqliteBackend
+from content_store import ContentStore, thaw
+from page_cache import PageCache
+from search_index import SearchIndex
+from media_storage import MediaStorage
+from chunked_uploads import ChunkedUploads, UploadError
+from task_queue import TaskQueue
+import media_derivatives
+from media_serving import send_media
+from media_mirror import MediaMirror
+from asset_pipeline import AssetPipeline
+from compression import CompressionMiddleware
+from metrics import MetricsRegistry
+from profiling import RequestProfiler
+from catalogue import Catalogue
+from static_export import StaticExporter
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key_here'
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
+# Behind nginx, set to an internal location aliased to the upload folder (e.g. '/_uploads/')
+# so media bodies are sent by the proxy instead of a gunicorn worker
+app.config['MEDIA_ACCEL_REDIRECT'] = os.environ.get('MEDIA_ACCEL_REDIRECT')
 
-# Ensure upload folder exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# Opt-in Prometheus metrics at /metrics; with METRICS_DIR set, all gunicorn workers are aggregated
+metrics = MetricsRegistry(enabled=os.environ.get('METRICS_ENABLED') == '1',
+                          shared_dir=os.environ.get('METRICS_DIR'))
+metrics.describe('http_request_duration_seconds', 'histogram', 'Request latency by route')
+metrics.describe('http_response_bytes_total', 'counter', 'Response body bytes by route')
+metrics.describe('app_phase_seconds', 'histogram', 'Time spent in content load, render, persist and file I/O')
+metrics.describe('app_upload_bytes_total', 'counter', 'Bytes of uploaded media written to disk')
+metrics.describe('app_page_cache_requests_total', 'counter', 'Cacheable page requests by outcome (hit, miss, not_modified)')
+
+# Opt-in cProfile captures: admins add ?_profile=1 or an X-Profile: 1 header to a request,
+# and PROFILE_SAMPLE_RATE (0-1) profiles that share of all requests. Viewed at /admin/profiles
+profiler = RequestProfiler(enabled=os.environ.get('PROFILING_ENABLED') == '1',
+                           sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+                           max_profiles=int(os.environ.get('PROFILE_BUFFER_SIZE', 20)))
+
+# Uploads are stored content-addressed (uploads/<sha256>.<ext>); creates the folder if needed
+media_storage = MediaStorage(app.config['UPLOAD_FOLDER'])
+
+# Directory a static copy of the public pages is kept in (see static_export.py); also
+# the default target of `python mysite.py export`
+app.config['STATIC_EXPORT_DIR'] = os.environ.get('STATIC_EXPORT_DIR')
+# Large files (long videos) are sent in chunks through /api/uploads, so no single
+# request has to exceed MAX_CONTENT_LENGTH
+app.config['CHUNKED_UPLOAD_MAX_SIZE'] = int(os.environ.get('CHUNKED_UPLOAD_MAX_SIZE', 2 * 1024 ** 3))
+app.config['UPLOAD_CHUNK_SIZE'] = 4 * 1024 * 1024
+chunked_uploads = ChunkedUploads(media_storage, app.config['CHUNKED_UPLOAD_MAX_SIZE'])
+
+# Resized/WebP copies of uploaded images are generated by background workers
+media_tasks = TaskQueue(max_workers=2, name='media')
+# Video posters and transcodes (ffmpeg) get their own single worker so a long
+# transcode never holds up image derivatives
+video_tasks = TaskQueue(max_workers=1, name='video')
 
 # Configuration
 ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'webm', 'ogg'}
+
+# With MIRROR_EXTERNAL_MEDIA=1, image/video URLs added in the editor are downloaded into
+# media storage by background workers and the guide is switched to the local copy;
+# the original URL stays in the entry's 'mirrored_from' as a fallback
+app.config['MIRROR_EXTERNAL_MEDIA'] = os.environ.get('MIRROR_EXTERNAL_MEDIA') == '1'
+media_mirror = MediaMirror(media_storage, {'image': ALLOWED_IMAGE_EXTENSIONS, 'video': ALLOWED_VIDEO_EXTENSIONS},
+                           timeout=float(os.environ.get('MIRROR_TIMEOUT', 10)),
+                           max_bytes=int(os.environ.get('MIRROR_MAX_BYTES', 200 * 1024 * 1024)),
+                           max_per_host=int(os.environ.get('MIRROR_MAX_PER_HOST', 2)),
+                           # Private and loopback hosts are refused unless explicitly allowed (local testing)
+                           allow_private=os.environ.get('MIRROR_ALLOW_PRIVATE') == '1')
+mirror_tasks = TaskQueue(max_workers=int(os.environ.get('MIRROR_WORKERS', 4)), name='mirror')
+mirror_lock = threading.Lock()
+ASSETS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+# Page CSS/JS bundles, built from ASSETS_FOLDER at startup
+ASSET_BUNDLES = {
+    'site.css': ['base.css', 'site.css'],
+    'content.css': ['base.css', 'content.css'],
+    'index.js': ['common.js', 'search.js'],
+    'admin.js': ['common.js', 'admin.js'],
+    'content.js': ['common.js', 'gallery.js'],
+}
 CONTENT_FILE = 'content.json'
+CONTENT_DB = 'content.db'
+# 'json' (content.json) or 'sqlite' (content.db); migrate with: python content_backends.py content.json content.db
+CONTENT_BACKEND = os.environ.get('CONTENT_BACKEND', 'json')
 
 # Admin users
 ADMIN_USERS = {
@@ -38,36 +117,74 @@ def allowed_file(filename, file_type='image'):
     allowed_extensions = ALLOWED_IMAGE_EXTENSIONS if file_type == 'image' else ALLOWED_VIDEO_EXTENSIONS
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
-def load_content():
-    try:
-        if os.path.exists(CONTENT_FILE):
-            with open(CONTENT_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except (json.JSONDecodeError, IOError) as e:
-        print(f"Error loading content: {e}")
-    
-    # Initialize content structure if file doesn't exist or is corrupted
+# Keys, display names and links for the grid, computed once and shared by templates and handlers
+catalogue = Catalogue(PLATFORMS, ACTIONS)
+app.jinja_env.globals['catalogue'] = catalogue
+
+def default_content():
     content = {}
-    for category, platforms in PLATFORMS.items():
-        for platform in platforms:
-            content[platform] = {}
-            for action in ACTIONS:
-                action_key = action.lower().replace(' ', '_')
-                content[platform][action_key] = {
-                    'text': f"Guide for {action} on {platform}",
-                    'images': [],
-                    'videos': [],
-                    'additional_content': ''
-                }
+    for platform in catalogue.platforms:
+        content[platform] = {}
+        for action in catalogue.actions:
+            content[platform][action.key] = {
+                'text': f"Guide for {action.name} on {platform}",
+                'images': [],
+                'videos': [],
+                'additional_content': ''
+            }
     return content
 
-def save_content(content):
+if CONTENT_BACKEND == 'sqlite':
+    content_backend = SqliteBackend(CONTENT_DB)
+else:
+    # content.json is written atomically under a file lock; single-entry edits go to a journal
+    content_backend = JsonFileBackend(CONTENT_FILE, default_factory=default_content)
+
+# Parsed content is cached per worker and re-read only when the backend changes
+content_store = ContentStore(content_backend, default_content)
+
+def content_snapshot():
+    # (version, content) for the current request; re-reads the backend only after a change
+    with metrics.timed('app_phase_seconds', phase='content_load'):
+        return content_store.snapshot()
+
+def load_content():
+    # Read-only view shared between requests; thaw() an entry before editing it
+    return content_snapshot()[1]
+
+# Inverted index over platform names, action labels and guide text, synced with content
+search_index = SearchIndex(catalogue.action_names)
+
+# Rendered public pages, keyed by (route, args) and tied to the content version
+page_cache = PageCache()
+
+def page_cache_key(*args):
+    # Admin pages and pages showing flashed messages are personalised, so never cached
+    if 'admin' in session or session.get('_flashes'):
+        return None
+    return shared_page_key(*args)
+
+def shared_page_key(*args):
+    # For pages whose templates never read the session: not touching it here keeps
+    # Flask from adding Vary: Cookie, so shared caches can keep one copy for everyone
+    return (request.endpoint, args)
+
+def content_changed():
+    content_store.invalidate()
+    page_cache.clear()
+
+def save_entry(platform, action, entry):
+    # Also called from background workers, which have no request to flash into
     try:
-        with open(CONTENT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(content, f, indent=4, ensure_ascii=False)
+        with metrics.timed('app_phase_seconds', phase='persist'):
+            content_backend.update_entry(platform, action, entry, initial_content=content_store.get_mutable)
+        content_changed()
+        return True
     except IOError as e:
         print(f"Error saving content: {e}")
-        flash('Error saving content', 'error')
+        if has_request_context():
+            flash('Error saving content', 'error')
+        return False
 
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -76,297 +193,10 @@ HTML_TEMPLATE = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Platform Account Guides</title>
-    <style>
-        /* Modern, clean CSS */
-        :root {
-            --primary: #00695c;
-            --primary-light: #00796b;
-            --primary-dark: #004d40;
-            --text: #333;
-            --text-light: #777;
-            --bg: #f5f5f5;
-            --card-bg: #fff;
-            --shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }
-        
-        body.dark-mode {
-            --primary: #00796b;
-            --primary-light: #00897b;
-            --primary-dark: #006064;
-            --text: #e0e0e0;
-            --text-light: #b0b0b0;
-            --bg: #121212;
-            --card-bg: #1e1e1e;
-            --shadow: 0 2px 10px rgba(0,0,0,0.3);
-        }
-        
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            margin: 0;
-            padding: 0;
-            background: var(--bg);
-            color: var(--text);
-            line-height: 1.6;
-            transition: all 0.3s ease;
-        }
-        header {
-            background: var(--primary);
-            color: white;
-            padding: 1.5rem;
-            text-align: center;
-            box-shadow: var(--shadow);
-        }
-        nav {
-            background: var(--primary-dark);
-            padding: 1rem;
-            display: flex;
-            justify-content: center;
-            flex-wrap: wrap;
-            gap: 1rem;
-        }
-        nav a {
-            color: white;
-            text-decoration: none;
-            padding: 0.5rem 1.5rem;
-            border-radius: 4px;
-            transition: all 0.3s ease;
-        }
-        nav a:hover {
-            background: var(--primary-light);
-            transform: translateY(-2px);
-        }
-        .container {
-            max-width: 1200px;
-            margin: 2rem auto;
-            padding: 0 1rem;
-        }
-        .card {
-            background: var(--card-bg);
-            border-radius: 8px;
-            padding: 1.5rem;
-            margin-bottom: 1.5rem;
-            box-shadow: var(--shadow);
-            transition: all 0.3s ease;
-        }
-        .platform-card {
-            margin-bottom: 2rem;
-        }
-        .action-link {
-            display: block;
-            color: var(--primary);
-            text-decoration: none;
-            padding: 0.8rem;
-            margin: 0.5rem 0;
-            border-left: 3px solid var(--primary-light);
-            transition: all 0.3s ease;
-            border-radius: 4px;
-        }
-        .action-link:hover {
-            background: rgba(0, 121, 107, 0.1);
-            transform: translateX(5px);
-        }
-        #searchInput {
-            width: 100%;
-            padding: 1rem;
-            border: 2px solid #ddd;
-            border-radius: 8px;
-            font-size: 1rem;
-            margin-bottom: 1rem;
-            transition: all 0.3s ease;
-            background: var(--card-bg);
-            color: var(--text);
-        }
-        #searchInput:focus {
-            border-color: var(--primary-light);
-            outline: none;
-            box-shadow: 0 0 0 3px rgba(0, 121, 107, 0.2);
-        }
-        .search-results {
-            background: var(--card-bg);
-            border-radius: 8px;
-            box-shadow: var(--shadow);
-            max-height: 300px;
-            overflow-y: auto;
-            display: none;
-            position: absolute;
-            width: calc(100% - 2rem);
-            z-index: 100;
-        }
-        .search-result {
-            padding: 1rem;
-            border-bottom: 1px solid var(--primary-dark);
-            transition: all 0.2s ease;
-        }
-        .search-result:hover {
-            background: rgba(0, 121, 107, 0.1);
-        }
-        .search-highlight {
-            background-color: #fff9c4;
-            font-weight: bold;
-            padding: 0 2px;
-            border-radius: 3px;
-            color: #333;
-        }
-        .btn {
-            background: var(--primary);
-            color: white;
-            border: none;
-            padding: 0.8rem 1.5rem;
-            border-radius: 4px;
-            cursor: pointer;
-            font-size: 1rem;
-            transition: all 0.3s ease;
-        }
-        .btn:hover {
-            background: var(--primary-dark);
-            transform: translateY(-2px);
-        }
-        .content-media {
-            max-width: 100%;
-            border-radius: 8px;
-            margin: 1rem 0;
-            box-shadow: var(--shadow);
-        }
-        .admin-form {
-            background: var(--card-bg);
-            padding: 1.5rem;
-            border-radius: 8px;
-        }
-        .form-group {
-            margin-bottom: 1.5rem;
-        }
-        .form-group label {
-            display: block;
-            margin-bottom: 0.5rem;
-            font-weight: 600;
-            color: var(--primary-light);
-        }
-        .form-control {
-            width: 100%;
-            padding: 0.8rem;
-            border: 1px solid var(--primary-dark);
-            border-radius: 4px;
-            font-size: 1rem;
-            background: var(--bg);
-            color: var(--text);
-        }
-        textarea.form-control {
-            min-height: 150px;
-        }
-        .tab-content {
-            display: none;
-        }
-        .tab-content.active {
-            display: block;
-        }
-        .action-tabs {
-            display: flex;
-            gap: 0.5rem;
-            margin-bottom: 1.5rem;
-            flex-wrap: wrap;
-        }
-        .action-tab {
-            padding: 0.5rem 1rem;
-            background: var(--primary-light);
-            color: white;
-            border-radius: 4px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-        }
-        .action-tab.active {
-            background: var(--primary-dark);
-        }
-        .action-tab:hover {
-            transform: translateY(-2px);
-        }
-        /* Dark mode toggle */
-        .dark-mode-toggle {
-            position: fixed;
-            bottom: 20px;
-            right: 20px;
-            background: var(--primary);
-            color: white;
-            width: 50px;
-            height: 50px;
-            border-radius: 50%;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            cursor: pointer;
-            box-shadow: var(--shadow);
-            z-index: 1000;
-            border: none;
-            outline: none;
-        }
-        /* Content page styles */
-        .content-page {
-            max-width: 800px;
-            margin: 2rem auto;
-            padding: 0 1rem;
-        }
-        .content-page img, 
-        .content-page video {
-            max-width: 100%;
-            border-radius: 8px;
-            margin: 1rem 0;
-            box-shadow: var(--shadow);
-        }
-        .error-message {
-            color: #d32f2f;
-            background-color: #fde8e8;
-            padding: 1rem;
-            border-radius: 4px;
-            margin-bottom: 1rem;
-        }
-        .url-option {
-            margin: 10px 0;
-            text-align: center;
-            font-weight: bold;
-            color: var(--primary);
-        }
-        /* New styles for multiple media */
-        .media-list {
-            margin-bottom: 1rem;
-        }
-        .media-item {
-            display: flex;
-            align-items: center;
-            padding: 0.5rem;
-            background: rgba(0, 121, 107, 0.1);
-            border-radius: 4px;
-            margin-bottom: 0.5rem;
-        }
-        .media-item a {
-            flex-grow: 1;
-            margin-right: 1rem;
-            word-break: break-all;
-        }
-        .media-item button {
-            background: #d32f2f;
-            color: white;
-            border: none;
-            padding: 0.3rem 0.6rem;
-            border-radius: 4px;
-            cursor: pointer;
-        }
-        .media-input-group {
-            margin-bottom: 1rem;
-        }
-        .add-media-btn {
-            background: var(--primary-light);
-            color: white;
-            border: none;
-            padding: 0.5rem 1rem;
-            border-radius: 4px;
-            cursor: pointer;
-            margin-top: 0.5rem;
-        }
-        .add-media-btn:hover {
-            background: var(--primary-dark);
-        }
-    </style>
+    <script>if (localStorage.getItem('darkMode') === 'true') document.documentElement.classList.add('dark-mode');</script>
+    <link rel="stylesheet" href="{{ asset_url('site.css') }}">
 </head>
-<body class="{% if 'dark_mode' in session %}dark-mode{% endif %}">
+<body>
     <header>
         <h1>Platform Account Guides</h1>
         <p>Complete tutorials for account management on all major platforms</p>
@@ -376,7 +206,7 @@ HTML_TEMPLATE = """
         <a href="{{ url_for('index') }}">Home</a>
         <a href="#search">Search</a>
         {% if 'admin' in session %}
-            <a href="#admin">Admin Panel</a>
+            <a href="{{ url_for('admin_panel') }}">Admin Panel</a>
             <a href="{{ url_for('logout') }}">Logout</a>
         {% else %}
             <a href="#admin">Admin Login</a>
@@ -397,20 +227,20 @@ HTML_TEMPLATE = """
         <section id="home" class="card">
             <h2>Platform Guides</h2>
             <div id="platformList">
-                {% for category, platforms in PLATFORMS.items() %}
+                {% set guide_links = catalogue.links('content_page') %}
+                {% for category in catalogue.categories %}
                 <div class="platform-card card">
-                    <h3>{{ category }}</h3>
-                    {% for platform in platforms %}
+                    <h3>{{ category.name }}</h3>
+                    {% for platform in category.platforms %}
                     <div class="platform-item">
                         <h4>{{ platform }}</h4>
                         <div class="action-links">
-                            {% for action in ACTIONS %}
-                                {% set action_key = action.lower().replace(' ', '_') %}
+                            {% for action, url in guide_links[platform] %}
                                 <a class="action-link" 
-                                   href="{{ url_for('content_page', platform=platform, action=action_key) }}"
+                                   href="{{ url }}"
                                    data-platform="{{ platform }}"
-                                   data-action="{{ action_key }}">
-                                    {{ action }}
+                                   data-action="{{ action.key }}">
+                                    {{ action.name }}
                                 </a>
                             {% endfor %}
                         </div>
@@ -424,7 +254,8 @@ HTML_TEMPLATE = """
         <section id="search" class="card">
             <h2>Search Guides</h2>
             <div style="position: relative;">
-                <input type="text" id="searchInput" placeholder="Search for platform or action..." autocomplete="off">
+                <input type="text" id="searchInput" placeholder="Search for platform or action..." autocomplete="off"
+                       data-search-url="{{ url_for('api_search') }}">
                 <div id="searchResults" class="search-results"></div>
             </div>
         </section>
@@ -433,83 +264,8 @@ HTML_TEMPLATE = """
         <section id="admin" class="card">
             <div class="admin-panel">
                 <h2>Admin Panel</h2>
-                {% for category, platforms in PLATFORMS.items() %}
-                    <h3>{{ category }}</h3>
-                    {% for platform in platforms %}
-                        <div class="platform-section card">
-                            <h4>{{ platform }}</h4>
-                            <div class="action-tabs">
-                                {% for action in ACTIONS %}
-                                    {% set action_key = action.lower().replace(' ', '_') %}
-                                    <div class="action-tab {% if loop.first %}active{% endif %}" 
-                                         onclick="showTab('{{ platform }}', '{{ action_key }}')">
-                                        {{ action }}
-                                    </div>
-                                {% endfor %}
-                            </div>
-                            
-                            {% for action in ACTIONS %}
-                                {% set action_key = action.lower().replace(' ', '_') %}
-                                <div id="{{ platform }}-{{ action_key }}-tab" class="tab-content {% if loop.first %}active{% endif %}">
-                                    <form method="post" action="{{ url_for('update_content') }}" enctype="multipart/form-data" class="admin-form">
-                                        <input type="hidden" name="platform" value="{{ platform }}">
-                                        <input type="hidden" name="action_type" value="{{ action_key }}">
-                                        
-                                        <div class="form-group">
-                                            <label>Main Content</label>
-                                            <textarea name="content_text" class="form-control">{{ content[platform][action_key]['text'] }}</textarea>
-                                        </div>
-                                        
-                                        <div class="form-group">
-                                            <label>Additional Content</label>
-                                            <textarea name="additional_content" class="form-control">{{ content[platform][action_key]['additional_content'] }}</textarea>
-                                        </div>
-                                        
-                                        <div class="form-group">
-                                            <label>Images</label>
-                                            <div class="media-list" id="{{ platform }}-{{ action_key }}-images-list">
-                                                {% for image in content[platform][action_key]['images'] %}
-                                                    <div class="media-item">
-                                                        <a href="{{ image if image.startswith('http') else url_for('static', filename='uploads/' + image.split('/')[-1]) }}" target="_blank">
-                                                            {{ image }}
-                                                        </a>
-                                                        <button type="button" onclick="removeMedia('{{ platform }}', '{{ action_key }}', 'image', {{ loop.index0 }})">Remove</button>
-                                                    </div>
-                                                {% endfor %}
-                                            </div>
-                                            <div class="media-input-group">
-                                                <input type="file" name="image_files" class="form-control" accept="image/*" multiple>
-                                                <div class="url-option">OR</div>
-                                                <input type="text" name="image_urls" class="form-control" placeholder="Enter image URLs (separate by comma)">
-                                            </div>
-                                        </div>
-                                        
-                                        <div class="form-group">
-                                            <label>Videos</label>
-                                            <div class="media-list" id="{{ platform }}-{{ action_key }}-videos-list">
-                                                {% for video in content[platform][action_key]['videos'] %}
-                                                    <div class="media-item">
-                                                        <a href="{{ video if video.startswith('http') else url_for('static', filename='uploads/' + video.split('/')[-1]) }}" target="_blank">
-                                                            {{ video }}
-                                                        </a>
-                                                        <button type="button" onclick="removeMedia('{{ platform }}', '{{ action_key }}', 'video', {{ loop.index0 }})">Remove</button>
-                                                    </div>
-                                                {% endfor %}
-                                            </div>
-                                            <div class="media-input-group">
-                                                <input type="file" name="video_files" class="form-control" accept="video/*" multiple>
-                                                <div class="url-option">OR</div>
-                                                <input type="text" name="video_urls" class="form-control" placeholder="Enter video URLs (separate by comma)">
-                                            </div>
-                                        </div>
-                                        
-                                        <button type="submit" class="btn">Save Content</button>
-                                    </form>
-                                </div>
-                            {% endfor %}
-                        </div>
-                    {% endfor %}
-                {% endfor %}
+                <p>Logged in as {{ session['username'] }}.</p>
+                <a href="{{ url_for('admin_panel') }}" class="btn">Open Content Editor</a>
             </div>
         </section>
         {% else %}
@@ -536,211 +292,10 @@ HTML_TEMPLATE = """
     </div>
 
     <button class="dark-mode-toggle" onclick="toggleDarkMode()">
-        {% if 'dark_mode' in session %}🌙{% else %}☀️{% endif %}
+        ☀️
     </button>
 
-    <script>
-        // Advanced search functionality
-        document.getElementById('searchInput').addEventListener('input', function() {
-            const searchTerm = this.value.trim().toLowerCase();
-            const resultsContainer = document.getElementById('searchResults');
-            
-            if (searchTerm.length < 2) {
-                resultsContainer.style.display = 'none';
-                return;
-            }
-            
-            // Tokenize search terms and remove small words
-            const searchTokens = searchTerm.split(' ')
-                .filter(token => token.length > 2);
-            
-            if (searchTokens.length === 0) {
-                resultsContainer.style.display = 'none';
-                return;
-            }
-            
-            const matches = [];
-            const actionLinks = document.querySelectorAll('.action-link');
-            
-            actionLinks.forEach(link => {
-                const linkText = link.textContent.toLowerCase();
-                const platform = link.dataset.platform.toLowerCase();
-                let matchScore = 0;
-                let matchedTokens = [];
-                
-                // Score each token match
-                searchTokens.forEach(token => {
-                    // Check in platform name
-                    if (platform.includes(token)) {
-                        matchScore += 15; // Higher score for platform matches
-                        matchedTokens.push(token);
-                    }
-                    
-                    // Check in action text
-                    if (linkText.includes(token)) {
-                        const tokenWeight = token.length / searchTerm.length;
-                        matchScore += tokenWeight * 10; // Base score
-                        
-                        // Bonus for exact matches
-                        if (linkText === token || 
-                            linkText.includes(` ${token} `) || 
-                            linkText.startsWith(`${token} `) || 
-                            linkText.endsWith(` ${token}`)) {
-                            matchScore += 5;
-                        }
-                        
-                        matchedTokens.push(token);
-                    }
-                });
-                
-                if (matchScore > 0) {
-                    matches.push({
-                        element: link,
-                        score: matchScore,
-                        text: link.textContent,
-                        platform: link.dataset.platform,
-                        action: link.dataset.action,
-                        matchedTokens: matchedTokens
-                    });
-                }
-            });
-            
-            // Sort by match score (best matches first)
-            matches.sort((a, b) => b.score - a.score);
-            
-            if (matches.length > 0) {
-                resultsContainer.innerHTML = '';
-                
-                // Group by platform for better organization
-                const platformGroups = {};
-                
-                matches.forEach(match => {
-                    if (!platformGroups[match.platform]) {
-                        platformGroups[match.platform] = [];
-                    }
-                    platformGroups[match.platform].push(match);
-                });
-                
-                // Display results grouped by platform
-                for (const [platform, platformMatches] of Object.entries(platformGroups)) {
-                    const platformHeader = document.createElement('div');
-                    platformHeader.className = 'search-result';
-                    platformHeader.innerHTML = `<strong>${platform}</strong>`;
-                    resultsContainer.appendChild(platformHeader);
-                    
-                    platformMatches.forEach(match => {
-                        let highlightedText = match.text;
-                        
-                        // Highlight all matched tokens
-                        match.matchedTokens.forEach(token => {
-                            const regex = new RegExp(token, 'gi');
-                            highlightedText = highlightedText.replace(regex, 
-                                `<span class="search-highlight">$&</span>`);
-                        });
-                        
-                        const resultItem = document.createElement('div');
-                        resultItem.className = 'search-result';
-                        resultItem.innerHTML = `
-                            <a href="/content/${match.platform}/${match.action}">
-                                ${highlightedText}
-                            </a>`;
-                        resultsContainer.appendChild(resultItem);
-                    });
-                }
-                
-                resultsContainer.style.display = 'block';
-            } else {
-                resultsContainer.innerHTML = '<div class="search-result">No results found</div>';
-                resultsContainer.style.display = 'block';
-            }
-        });
-
-        // Close search results when clicking elsewhere
-        document.addEventListener('click', function(e) {
-            const searchContainer = document.querySelector('#search');
-            if (!searchContainer.contains(e.target)) {
-                document.getElementById('searchResults').style.display = 'none';
-            }
-        });
-
-        // Tab switching in admin panel
-        function showTab(platform, action) {
-            // Hide all tabs for this platform
-            const section = document.querySelector(`#${platform}-${action}-tab`).closest('.platform-section');
-            section.querySelectorAll('.tab-content').forEach(tab => {
-                tab.classList.remove('active');
-            });
-            
-            // Show selected tab
-            document.getElementById(`${platform}-${action}-tab`).classList.add('active');
-            
-            // Update active tab styling
-            section.querySelectorAll('.action-tab').forEach(tab => {
-                tab.classList.remove('active');
-            });
-            event.target.classList.add('active');
-        }
-
-        // Dark mode toggle
-        function toggleDarkMode() {
-            document.body.classList.toggle('dark-mode');
-            const isDarkMode = document.body.classList.contains('dark-mode');
-            localStorage.setItem('darkMode', isDarkMode);
-            
-            // Update toggle button icon
-            const toggleBtn = document.querySelector('.dark-mode-toggle');
-            if (isDarkMode) {
-                toggleBtn.innerHTML = '🌙';
-            } else {
-                toggleBtn.innerHTML = '☀️';
-            }
-            
-            // Send to server to store in session
-            fetch('/toggle_dark_mode', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ dark_mode: isDarkMode })
-            });
-        }
-
-        // Initialize dark mode if previously set
-        if (localStorage.getItem('darkMode') === 'true') {
-            document.body.classList.add('dark-mode');
-            document.querySelector('.dark-mode-toggle').innerHTML = '🌙';
-        }
-
-        // Remove media (image or video)
-        function removeMedia(platform, action, mediaType, index) {
-            if (confirm(`Are you sure you want to remove this ${mediaType}?`)) {
-                fetch('/remove_media', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({
-                        platform: platform,
-                        action: action,
-                        media_type: mediaType,
-                        index: index
-                    })
-                })
-                .then(response => response.json())
-                .then(data => {
-                    if (data.success) {
-                        location.reload();
-                    } else {
-                        alert('Error removing media');
-                    }
-                })
-                .catch(error => {
-                    console.error('Error:', error);
-                    alert('Error removing media');
-                });
-            }
-        }
-    </script>
+    <script src="{{ asset_url('index.js') }}"></script>
 </body>
 </html>
 """
@@ -752,102 +307,10 @@ CONTENT_PAGE_TEMPLATE = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>{{ platform }} - {{ action }}</title>
-    <style>
-        :root {
-            --primary: #00695c;
-            --primary-light: #00796b;
-            --primary-dark: #004d40;
-            --text: #333;
-            --text-light: #777;
-            --bg: #f5f5f5;
-            --card-bg: #fff;
-            --shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }
-        
-        body.dark-mode {
-            --primary: #00796b;
-            --primary-light: #00897b;
-            --primary-dark: #006064;
-            --text: #e0e0e0;
-            --text-light: #b0b0b0;
-            --bg: #121212;
-            --card-bg: #1e1e1e;
-            --shadow: 0 2px 10px rgba(0,0,0,0.3);
-        }
-        
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            margin: 0;
-            padding: 0;
-            background: var(--bg);
-            color: var(--text);
-            line-height: 1.6;
-            transition: all 0.3s ease;
-        }
-        .content-page {
-            max-width: 800px;
-            margin: 2rem auto;
-            padding: 0 1rem;
-        }
-        .content-card {
-            background: var(--card-bg);
-            border-radius: 8px;
-            padding: 2rem;
-            box-shadow: var(--shadow);
-        }
-        .content-card img, 
-        .content-card video {
-            max-width: 100%;
-            border-radius: 8px;
-            margin: 1rem 0;
-            box-shadow: var(--shadow);
-        }
-        .back-btn {
-            display: inline-block;
-            background: var(--primary);
-            color: white;
-            padding: 0.8rem 1.5rem;
-            text-decoration: none;
-            border-radius: 4px;
-            margin-top: 1rem;
-            transition: all 0.3s ease;
-        }
-        .back-btn:hover {
-            background: var(--primary-dark);
-            transform: translateY(-2px);
-        }
-        .dark-mode-toggle {
-            position: fixed;
-            bottom: 20px;
-            right: 20px;
-            background: var(--primary);
-            color: white;
-            width: 50px;
-            height: 50px;
-            border-radius: 50%;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            cursor: pointer;
-            box-shadow: var(--shadow);
-            z-index: 1000;
-            border: none;
-            outline: none;
-        }
-        /* Media gallery styles */
-        .media-gallery {
-            display: flex;
-            flex-wrap: wrap;
-            gap: 1rem;
-            margin: 1rem 0;
-        }
-        .media-item {
-            flex: 1 1 300px;
-            max-width: 100%;
-        }
-    </style>
+    <script>if (localStorage.getItem('darkMode') === 'true') document.documentElement.classList.add('dark-mode');</script>
+    <link rel="stylesheet" href="{{ asset_url('content.css') }}">
 </head>
-<body class="{% if 'dark_mode' in session %}dark-mode{% endif %}">
+<body>
     <div class="content-page">
         <div class="content-card">
             <h1>{{ platform }} - {{ action }}</h1>
@@ -862,43 +325,21 @@ CONTENT_PAGE_TEMPLATE = """
             </div>
             {% endif %}
             
+            <!-- The first MEDIA_PAGE_SIZE items of each gallery are rendered here; gallery.js
+                 fetches the rest from api_media as the reader scrolls towards them -->
             {% if content.images %}
             <h3>Images</h3>
-            <div class="media-gallery">
-                {% for image in content.images %}
-                    {% if image.startswith('http') %}
-                        <div class="media-item">
-                            <img src="{{ image }}" alt="{{ platform }} {{ action }} image {{ loop.index }}">
-                        </div>
-                    {% else %}
-                        <div class="media-item">
-                            <img src="{{ url_for('static', filename='uploads/' + image.split('/')[-1]) }}" 
-                                 alt="{{ platform }} {{ action }} image {{ loop.index }}">
-                        </div>
-                    {% endif %}
-                {% endfor %}
+            <div class="media-gallery"
+                 {% if content.images|length > MEDIA_PAGE_SIZE %}data-next="{{ url_for('api_media', platform=platform_key, action=action_key, media_type='image', offset=MEDIA_PAGE_SIZE) }}"{% endif %}>
+                {{ media.images(platform, action, content.images[:MEDIA_PAGE_SIZE], 0, content.get('mirrored_from')) }}
             </div>
             {% endif %}
             
             {% if content.videos %}
             <h3>Videos</h3>
-            <div class="media-gallery">
-                {% for video in content.videos %}
-                    {% if video.startswith('http') %}
-                        <div class="media-item">
-                            <video controls>
-                                <source src="{{ video }}" type="video/mp4">
-                            </video>
-                        </div>
-                    {% else %}
-                        <div class="media-item">
-                            <video controls>
-                                <source src="{{ url_for('static', filename='uploads/' + video.split('/')[-1]) }}" 
-                                        type="video/mp4">
-                            </video>
-                        </div>
-                    {% endif %}
-                {% endfor %}
+            <div class="media-gallery"
+                 {% if content.videos|length > MEDIA_PAGE_SIZE %}data-next="{{ url_for('api_media', platform=platform_key, action=action_key, media_type='video', offset=MEDIA_PAGE_SIZE) }}"{% endif %}>
+                {{ media.videos(content.videos[:MEDIA_PAGE_SIZE], content.get('mirrored_from')) }}
             </div>
             {% endif %}
             
@@ -907,58 +348,481 @@ CONTENT_PAGE_TEMPLATE = """
     </div>
 
     <button class="dark-mode-toggle" onclick="toggleDarkMode()">
-        {% if 'dark_mode' in session %}🌙{% else %}☀️{% endif %}
+        ☀️
     </button>
 
-    <script>
-        // Dark mode toggle
-        function toggleDarkMode() {
-            document.body.classList.toggle('dark-mode');
-            const isDarkMode = document.body.classList.contains('dark-mode');
-            localStorage.setItem('darkMode', isDarkMode);
-            
-            // Update toggle button icon
-            const toggleBtn = document.querySelector('.dark-mode-toggle');
-            if (isDarkMode) {
-                toggleBtn.innerHTML = '🌙';
-            } else {
-                toggleBtn.innerHTML = '☀️';
-            }
-            
-            // Send to server to store in session
-            fetch('/toggle_dark_mode', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ dark_mode: isDarkMode })
-            });
-        }
-
-        // Initialize dark mode if previously set
-        if (localStorage.getItem('darkMode') === 'true') {
-            document.body.classList.add('dark-mode');
-            document.querySelector('.dark-mode-toggle').innerHTML = '🌙';
-        }
-    </script>
+    <script src="{{ asset_url('content.js') }}"></script>
+</body>
+</html>
+"""
+
+ADMIN_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Admin Panel - Platform Account Guides</title>
+    <script>if (localStorage.getItem('darkMode') === 'true') document.documentElement.classList.add('dark-mode');</script>
+    <link rel="stylesheet" href="{{ asset_url('site.css') }}">
+</head>
+<body>
+    <header>
+        <h1>Admin Panel</h1>
+        <p>Logged in as {{ session['username'] }}</p>
+    </header>
+
+    <nav>
+        <a href="{{ url_for('index') }}">Home</a>
+        <a href="{{ url_for('logout') }}">Logout</a>
+    </nav>
+
+    <div class="container">
+        {% with messages = get_flashed_messages(with_categories=true) %}
+            {% if messages %}
+                {% for category, message in messages %}
+                    <div class="card error-message">
+                        {{ message }}
+                    </div>
+                {% endfor %}
+            {% endif %}
+        {% endwith %}
+
+        <section id="admin" class="card">
+            <div class="admin-panel">
+                {% set editor_links = catalogue.links('admin_editor') %}
+                {% for category in catalogue.categories %}
+                    <h3>{{ category.name }}</h3>
+                    {% for platform in category.platforms %}
+                        <!-- Each platform's forms are fetched from admin_editor when it is opened -->
+                        <details id="{{ platform }}" class="platform-section card" data-platform="{{ platform }}">
+                            <summary><h4 style="display: inline;">{{ platform }}</h4></summary>
+                            <div class="action-tabs">
+                                {% for action in catalogue.actions %}
+                                    <div class="action-tab" data-action="{{ action.key }}"
+                                         onclick="showTab('{{ platform }}', '{{ action.key }}')">
+                                        {{ action.name }}
+                                    </div>
+                                {% endfor %}
+                            </div>
+                            
+                            {% for action, url in editor_links[platform] %}
+                                <div id="{{ platform }}-{{ action.key }}-tab" class="tab-content"
+                                     data-src="{{ url }}"></div>
+                            {% endfor %}
+                        </details>
+                    {% endfor %}
+                {% endfor %}
+            </div>
+        </section>
+    </div>
+
+    <button class="dark-mode-toggle" onclick="toggleDarkMode()">
+        ☀️
+    </button>
+
+    <script src="{{ asset_url('admin.js') }}"></script>
 </body>
 </html>
 """
 
+# Edit form for a single platform/action, loaded into the admin panel on demand
+ADMIN_EDITOR_TEMPLATE = """
+<form method="post" action="{{ url_for('update_content') }}" enctype="multipart/form-data" class="admin-form"
+      data-upload-url="{{ url_for('create_upload') }}">
+    <input type="hidden" name="platform" value="{{ platform }}">
+    <input type="hidden" name="action_type" value="{{ action_key }}">
+    
+    <div class="form-group">
+        <label>Main Content</label>
+        <textarea name="content_text" class="form-control">{{ entry['text'] }}</textarea>
+    </div>
+    
+    <div class="form-group">
+        <label>Additional Content</label>
+        <textarea name="additional_content" class="form-control">{{ entry['additional_content'] }}</textarea>
+    </div>
+    
+    <div class="form-group">
+        <label>Images</label>
+        <div class="media-list" id="{{ platform }}-{{ action_key }}-images-list">
+            {% for image in entry['images'] %}
+                <div class="media-item">
+                    <a href="{{ media_url(image) }}" target="_blank">
+                        {{ image }}
+                    </a>
+                    <button type="button" onclick="removeMedia('{{ platform }}', '{{ action_key }}', 'image', {{ loop.index0 }})">Remove</button>
+                </div>
+            {% endfor %}
+        </div>
+        <div class="media-input-group">
+            <input type="file" name="image_files" class="form-control" accept="image/*" multiple>
+            <div class="url-option">OR</div>
+            <input type="text" name="image_urls" class="form-control" placeholder="Enter image URLs (separate by comma)">
+        </div>
+    </div>
+    
+    <div class="form-group">
+        <label>Videos</label>
+        <div class="media-list" id="{{ platform }}-{{ action_key }}-videos-list">
+            {% for video in entry['videos'] %}
+                <div class="media-item">
+                    <a href="{{ media_url(video) }}" target="_blank">
+                        {{ video }}
+                    </a>
+                    <button type="button" onclick="removeMedia('{{ platform }}', '{{ action_key }}', 'video', {{ loop.index0 }})">Remove</button>
+                </div>
+            {% endfor %}
+        </div>
+        <div class="media-input-group">
+            <input type="file" name="video_files" class="form-control" accept="video/*" multiple>
+            <div class="url-option">OR</div>
+            <input type="text" name="video_urls" class="form-control" placeholder="Enter video URLs (separate by comma)">
+        </div>
+    </div>
+    
+    <!-- Selected files are sent in chunks through /api/uploads before the form is saved -->
+    <div class="upload-progress" hidden>
+        <progress value="0" max="100"></progress>
+        <span class="upload-status"></span>
+    </div>
+    
+    <button type="submit" class="btn">Save Content</button>
+</form>
+"""
+
+# Gallery items, shared by the content page and the api_media pages that extend it
+MEDIA_ITEMS_TEMPLATE = """
+{% macro images(platform, action, items, start, mirrored=None) %}
+    {% for image in items %}
+        {% set sources = image_sources(image) %}
+        {% set fallback = mirrored.get(image) if mirrored else None %}
+        <div class="media-item">
+            <picture>
+                {% if sources.webp_srcset %}
+                <source type="image/webp" srcset="{{ sources.webp_srcset }}" sizes="{{ IMAGE_SIZES }}">
+                {% endif %}
+                <img src="{{ sources.src }}"
+                     {% if sources.srcset %}srcset="{{ sources.srcset }}" sizes="{{ IMAGE_SIZES }}"{% endif %}
+                     {% if sources.width %}width="{{ sources.width }}" height="{{ sources.height }}"{% endif %}
+                     loading="{{ 'eager' if start + loop.index0 == 0 else 'lazy' }}" decoding="async"
+                     {% if fallback %}
+                     data-fallback="{{ fallback }}"
+                     onerror="this.onerror = null; this.removeAttribute('srcset'); this.parentNode.querySelectorAll('source').forEach(function (s) { s.remove(); }); this.src = this.dataset.fallback;"
+                     {% endif %}
+                     alt="{{ platform }} {{ action }} image {{ start + loop.index }}">
+            </picture>
+        </div>
+    {% endfor %}
+{% endmacro %}
+
+{% macro videos(items, mirrored=None) %}
+    {% for video in items %}
+        {% set sources = video_sources(video) %}
+        {% set fallback = mirrored.get(video) if mirrored else None %}
+        <div class="media-item">
+            <!-- Nothing is fetched until play; the poster stands in for the first frame -->
+            <video controls preload="none"
+                   {% if sources.poster %}poster="{{ sources.poster }}"{% endif %}
+                   {% if sources.width %}width="{{ sources.width }}" height="{{ sources.height }}"{% endif %}>
+                {% for rendition in sources.renditions %}
+                <source src="{{ rendition.src }}" type="{{ rendition.type }}" media="(max-width: 800px)">
+                {% endfor %}
+                <source src="{{ sources.src }}" type="{{ sources.type }}">
+                {% if fallback %}
+                <!-- Mirrored copy: the browser moves on to the original if the local file fails -->
+                <source src="{{ fallback }}" type="{{ sources.type }}">
+                {% endif %}
+            </video>
+        </div>
+    {% endfor %}
+{% endmacro %}
+"""
+
+# Fingerprinted, minified and precompressed once per process
+assets = AssetPipeline(ASSETS_FOLDER, ASSET_BUNDLES, minify=os.environ.get('ASSETS_MINIFY', '1') == '1')
+
+@app.template_global()
+def asset_url(name):
+    return url_for('asset', filename=assets.filename(name))
+
+# Templates are compiled once at import; handlers render the compiled objects
+TEMPLATE_SOURCES = {
+    'index': HTML_TEMPLATE,
+    'content_page': CONTENT_PAGE_TEMPLATE,
+    'admin': ADMIN_TEMPLATE,
+    'admin_editor': ADMIN_EDITOR_TEMPLATE,
+    'media_items': MEDIA_ITEMS_TEMPLATE,
+}
+TEMPLATES = {name: app.jinja_env.from_string(source) for name, source in TEMPLATE_SOURCES.items()}
+TEMPLATE_VERSION = hashlib.sha1((''.join(TEMPLATE_SOURCES.values()) + assets.version).encode('utf-8')).hexdigest()
+TEMPLATE_MTIME = os.path.getmtime(__file__)
+
+# Gallery items rendered with the page; the rest are loaded in pages of this size
+MEDIA_PAGE_SIZE = 12
+app.jinja_env.globals['MEDIA_PAGE_SIZE'] = MEDIA_PAGE_SIZE
+
+def render_page(name, **context):
+    with metrics.timed('app_phase_seconds', phase='render'):
+        return render_template(TEMPLATES[name], **context)
+
+# Streamed pages are sent in chunks of at least this many characters
+STREAM_CHUNK_SIZE = 4096
+
+def stream_page(name, **context):
+    # Sends <head> and the page header as soon as they are rendered, then the rest in chunks.
+    # Flashed messages are popped now, while the session cookie can still be updated;
+    # the template's get_flashed_messages() call returns this same list
+    get_flashed_messages(with_categories=True)
+    chunks = iter(stream_template(TEMPLATES[name], **context))
+    # Request metrics are recorded once the body has been sent (see record_request_metrics)
+    sent = g.streamed_page = {'bytes': 0}
+    
+    def emit(buffer):
+        data = ''.join(buffer).encode('utf-8')
+        sent['bytes'] += len(data)
+        return data
+    
+    def generate():
+        buffer, length, header_sent = [], 0, False
+        # Only time spent rendering counts, not time waiting for the client to take a chunk
+        rendering = 0.0
+        try:
+            while True:
+                started = time.perf_counter()
+                chunk = next(chunks, None)
+                rendering += time.perf_counter() - started
+                if chunk is None:
+                    break
+                buffer.append(chunk)
+                length += len(chunk)
+                if length >= STREAM_CHUNK_SIZE or (not header_sent and '</header>' in chunk):
+                    header_sent = True
+                    yield emit(buffer)
+                    buffer, length = [], 0
+            if buffer:
+                yield emit(buffer)
+        finally:
+            metrics.observe('app_phase_seconds', rendering, phase='render')
+    
+    return app.response_class(generate(), mimetype='text/html')
+
+def serve_page(cache_key, version, render, stream=None, modified_at=0):
+    # Personalised pages are rendered (or streamed) every time and carry no validators.
+    # modified_at: latest change (seconds since the epoch) to anything else the page embeds
+    if cache_key is None:
+        return stream() if stream else render()
+
+    etag = hashlib.sha1(repr((version, TEMPLATE_VERSION, cache_key)).encode('utf-8')).hexdigest()
+    content_mtime = content_backend.last_modified() or 0
+    last_modified = datetime.fromtimestamp(max(content_mtime, modified_at, TEMPLATE_MTIME), timezone.utc)
+
+    # Answer If-None-Match / If-Modified-Since before rendering anything
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        metrics.inc('app_page_cache_requests_total', result='not_modified')
+        response = app.response_class(status=304)
+    else:
+        page = page_cache.get(cache_key, version)
+        if page is None:
+            metrics.inc('app_page_cache_requests_total', result='miss')
+            page = render()
+            page_cache.set(cache_key, version, page)
+        else:
+            metrics.inc('app_page_cache_requests_total', result='hit')
+        response = make_response(page)
+
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # Identical for every anonymous visitor, so shared caches may keep it too,
+    # but they must revalidate so admin edits show up
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response
+
+# Rendered width of gallery images, so browsers pick the smallest sufficient derivative
+IMAGE_SIZES = '(max-width: 800px) 100vw, 736px'
+app.jinja_env.globals['IMAGE_SIZES'] = IMAGE_SIZES
+
+@app.template_global()
+def media_url(media_path):
+    if media_path.startswith('http'):
+        return media_path
+    return url_for('uploaded_file', filename=media_path.split('/')[-1])
+
+@app.template_global()
+def image_sources(image):
+    sources = {'src': media_url(image), 'srcset': '', 'webp_srcset': '', 'width': None, 'height': None}
+    info = None if image.startswith('http') else media_derivatives.read_info(media_storage, image)
+    if info:
+        sources['width'] = info['width']
+        sources['height'] = info['height']
+        sources['webp_srcset'] = ', '.join(f"{media_url(name)} {width}w" for width, name in info['webp'])
+        if info['jpeg']:
+            sources['srcset'] = ', '.join([f"{media_url(name)} {width}w" for width, name in info['jpeg']]
+                                          + [f"{sources['src']} {info['width']}w"])
+    return sources
+
+@app.template_global()
+def video_sources(video):
+    sources = {'src': media_url(video), 'type': media_derivatives.video_mimetype(video),
+               'poster': None, 'width': None, 'height': None, 'renditions': []}
+    info = None if video.startswith('http') else media_derivatives.read_info(media_storage, video)
+    if info:
+        sources['poster'] = media_url(info['poster']) if info.get('poster') else None
+        sources['width'] = info['width']
+        sources['height'] = info['height']
+        sources['renditions'] = [{'src': media_url(name), 'type': mime} for height, name, mime in info['renditions']]
+    return sources
+
+# Macros of the gallery template; created after the globals they call are registered
+media = TEMPLATES['media_items'].module
+app.jinja_env.globals['media'] = media
+
+# With STATIC_EXPORT_DIR set, public pages touched by an edit are re-exported in the background
+static_exporter = None
+if app.config['STATIC_EXPORT_DIR']:
+    static_exporter = StaticExporter(app, app.config['STATIC_EXPORT_DIR'], assets, MEDIA_PAGE_SIZE)
+export_tasks = TaskQueue(max_workers=1, name='export')
+
+def export_changed_pages(platform, action):
+    static_exporter.export_changed(load_content(), platform, action)
+
+def queue_static_export(platform, action):
+    if static_exporter is None:
+        return
+    # Keyed by version so an edit made while an export runs is exported again afterwards
+    version = (content_snapshot()[0], media_derivatives.version(media_storage))
+    export_tasks.submit(('export', platform, action, version), export_changed_pages, platform, action)
+
+def process_media(generate, media_path, platform, action):
+    generate(media_storage, media_path)
+    # Derivatives change the page's srcsets and posters
+    queue_static_export(platform, action)
+
+def queue_media_jobs(media_path, media_type, platform, action):
+    if media_type == 'image':
+        queue, generate = media_tasks, media_derivatives.generate_image_derivatives
+    else:
+        queue, generate = video_tasks, media_derivatives.generate_video_derivatives
+    queue.submit(('derivatives', media_path), process_media, generate, media_path, platform, action)
+
+def mirror_media(url, media_type, platform, action):
+    media_path = media_mirror.fetch(url, media_type)
+    media_key = f"{media_type}s"
+    # Mirrors of one guide's URLs finish concurrently; each must see the others' rewrites
+    with mirror_lock:
+        content = load_content()
+        if platform not in content or action not in content[platform] or url not in content[platform][action][media_key]:
+            # The URL was removed while it downloaded
+            media_storage.release(content, media_path)
+            return
+        entry = thaw(content[platform][action])
+        entry[media_key] = [media_path if item == url else item for item in entry[media_key]]
+        entry.setdefault('mirrored_from', {})[media_path] = url
+        if not save_entry(platform, action, entry):
+            # The guide still points at the remote URL; drop the unreferenced copy
+            media_storage.release(content, media_path)
+            return
+    queue_media_jobs(media_path, media_type, platform, action)
+    queue_static_export(platform, action)
+
+def queue_mirror_jobs(urls, platform, action):
+    if not app.config['MIRROR_EXTERNAL_MEDIA']:
+        return
+    for url, media_type in urls:
+        mirror_tasks.submit(('mirror', platform, action, url), mirror_media, url, media_type, platform, action)
+
+def save_upload(file_storage):
+    with metrics.timed('app_phase_seconds', phase='file_io'):
+        media_path = media_storage.store_upload(file_storage)
+    metrics.inc('app_upload_bytes_total', os.path.getsize(media_storage.file_path(media_path)))
+    return media_path
+
+if metrics.enabled:
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        endpoint = request.endpoint or 'unmatched'
+        started, labels = g.request_started, dict(endpoint=endpoint, method=request.method, status=response.status_code)
+        
+        def record(length):
+            metrics.observe('http_request_duration_seconds', time.perf_counter() - started, **labels)
+            if length is not None:
+                metrics.inc('http_response_bytes_total', length, endpoint=endpoint)
+            metrics.maybe_flush()
+        
+        streamed = g.pop('streamed_page', None)
+        if streamed is not None:
+            # A streamed page is rendered after this hook; record it once the last chunk is sent
+            response.call_on_close(lambda: record(streamed['bytes']))
+        else:
+            record(response.content_length)
+        return response
+
+if profiler.enabled:
+    @app.before_request
+    def start_profile():
+        requested = request.args.get('_profile') == '1' or request.headers.get('X-Profile') == '1'
+        if (requested and 'admin' in session) or profiler.should_sample():
+            g.profile = profiler.start()
+
+    @app.after_request
+    def finish_profile(response):
+        capture = g.pop('profile', None)
+        if capture is not None:
+            # Streamed bodies are rendered after this hook, so stop once the body is sent
+            method, path, status = request.method, request.full_path.rstrip('?'), response.status_code
+            response.call_on_close(lambda: profiler.finish(capture, method, path, status))
+        return response
+
+    @app.teardown_request
+    def discard_profile(exc):
+        # Left over only when the view raised before after_request ran
+        capture = g.pop('profile', None)
+        if capture is not None:
+            profiler.finish(capture, request.method, request.full_path.rstrip('?'), 500)
+
+@app.route('/admin/profiles')
+def admin_profiles():
+    if not profiler.enabled:
+        abort(404)
+    if 'admin' not in session:
+        return 'Unauthorized', 401
+    return jsonify({'profiles': profiler.summaries()})
+
+@app.route('/admin/profiles/<int:profile_id>')
+def admin_profile(profile_id):
+    if not profiler.enabled:
+        abort(404)
+    if 'admin' not in session:
+        return 'Unauthorized', 401
+    report = profiler.report(profile_id, sort=request.args.get('sort', 'cumulative'))
+    if report is None:
+        abort(404)
+    return app.response_class(report, mimetype='text/plain')
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if not metrics.enabled:
+        abort(404)
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/')
 def index():
-    content = load_content()
     login_error = request.args.get('login_error', '')
+    version, content = content_snapshot()
+    context = dict(content=content, login_error=login_error)
     
-    return render_template_string(HTML_TEMPLATE, 
-                               PLATFORMS=PLATFORMS,
-                               ACTIONS=ACTIONS,
-                               content=content,
-                               login_error=login_error)
+    return serve_page(page_cache_key(login_error), version,
+                      lambda: render_page('index', **context),
+                      lambda: stream_page('index', **context))
 
 @app.route('/content/<platform>/<action>')
 def content_page(platform, action):
-    content_data = load_content()
+    version, content_data = content_snapshot()
     
     if platform not in content_data:
         flash('Platform not found', 'error')
@@ -968,11 +832,92 @@ def content_page(platform, action):
         flash('Action not found for this platform', 'error')
         return redirect(url_for('index'))
     
-    action_display = action.replace('_', ' ').title()
-    return render_template_string(CONTENT_PAGE_TEMPLATE,
-                                platform=platform,
-                                action=action_display,
-                                content=content_data[platform][action])
+    action_display = catalogue.action_name(action)
+    # Pages embed srcsets, so they also change when background derivatives finish
+    derivatives_version = media_derivatives.version(media_storage)
+    page_version = (version, derivatives_version)
+    return serve_page(shared_page_key(platform, action), page_version,
+                      lambda: render_page('content_page',
+                                          platform=platform,
+                                          action=action_display,
+                                          platform_key=platform,
+                                          action_key=action,
+                                          content=content_data[platform][action]),
+                      modified_at=(derivatives_version or 0) / 1e9)
+
+@app.route('/api/media/<platform>/<action>/<media_type>')
+def api_media(platform, action, media_type):
+    # One page of a guide's gallery as an HTML fragment, plus the URL of the next page
+    version, content_data = content_snapshot()
+    if platform not in content_data or action not in content_data[platform] or media_type not in ['image', 'video']:
+        abort(404)
+    offset = request.args.get('offset', 0, type=int)
+    entry = content_data[platform][action]
+    items = entry[f"{media_type}s"]
+    # Only the offsets data-next links to, so arbitrary values cannot flood the page cache
+    if offset < 0 or offset % MEDIA_PAGE_SIZE or (offset and offset >= len(items)):
+        abort(404)
+    
+    def render():
+        page = items[offset:offset + MEDIA_PAGE_SIZE]
+        with metrics.timed('app_phase_seconds', phase='render'):
+            if media_type == 'image':
+                html = media.images(platform, catalogue.action_name(action), page, offset, entry.get('mirrored_from'))
+            else:
+                html = media.videos(page, entry.get('mirrored_from'))
+        next_offset = offset + MEDIA_PAGE_SIZE
+        next_url = None
+        if next_offset < len(items):
+            next_url = url_for('api_media', platform=platform, action=action, media_type=media_type, offset=next_offset)
+        return json.dumps({'html': str(html), 'next': next_url, 'total': len(items)})
+    
+    derivatives_version = media_derivatives.version(media_storage)
+    page_version = (version, derivatives_version)
+    response = make_response(serve_page(shared_page_key(platform, action, media_type, offset), page_version, render,
+                                        modified_at=(derivatives_version or 0) / 1e9))
+    response.mimetype = 'application/json'
+    return response
+
+@app.route('/admin')
+def admin_panel():
+    if 'admin' not in session:
+        flash('Unauthorized access', 'error')
+        return redirect(url_for('index', _anchor='admin'))
+    
+    return stream_page('admin')
+
+@app.route('/admin/editor/<platform>/<action>')
+def admin_editor(platform, action):
+    if 'admin' not in session:
+        return 'Unauthorized', 401
+    
+    content = load_content()
+    if platform not in content or action not in content[platform]:
+        return 'Content not found', 404
+    
+    return render_page('admin_editor',
+                       platform=platform,
+                       action_key=action,
+                       entry=content[platform][action])
+
+@app.route('/api/search')
+def api_search():
+    query = request.args.get('q', '')
+    version, content = content_snapshot()
+    search_index.sync(version, content)
+    
+    results = []
+    for platform, action, score in search_index.search(query):
+        text = content[platform][action]['text']
+        results.append({
+            'platform': platform,
+            'action': action,
+            'label': catalogue.action_name(action),
+            'url': url_for('content_page', platform=platform, action=action),
+            'snippet': text[:120] + ('...' if len(text) > 120 else ''),
+            'score': round(score, 2)
+        })
+    return jsonify({'query': query, 'results': results})
 
 @app.route('/login', methods=['POST'])
 def login():
@@ -993,17 +938,8 @@ def login():
 def logout():
     session.pop('admin', None)
     session.pop('username', None)
-    session.pop('dark_mode', None)
     return redirect(url_for('index'))
 
-@app.route('/toggle_dark_mode', methods=['POST'])
-def toggle_dark_mode():
-    if request.is_json:
-        data = request.get_json()
-        session['dark_mode'] = data.get('dark_mode', False)
-        return jsonify({'success': True})
-    return jsonify({'success': False})
-
 @app.route('/update_content', methods=['POST'])
 def update_content():
     if 'admin' not in session:
@@ -1023,9 +959,11 @@ def update_content():
         flash('Invalid platform or action', 'error')
         return redirect(url_for('index'))
     
+    entry = thaw(content[platform][action_type])
+    
     # Update text content
-    content[platform][action_type]['text'] = request.form.get('content_text', '')
-    content[platform][action_type]['additional_content'] = request.form.get('additional_content', '')
+    entry['text'] = request.form.get('content_text', '')
+    entry['additional_content'] = request.form.get('additional_content', '')
     
     # Handle image uploads
     if 'image_files' in request.files:
@@ -1034,19 +972,22 @@ def update_content():
             if image_file.filename != '':
                 if allowed_file(image_file.filename, 'image'):
                     try:
-                        filename = secure_filename(f"{platform}_{action_type}_img_{datetime.now().timestamp()}_{image_file.filename}")
-                        image_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                        image_file.save(image_path)
-                        content[platform][action_type]['images'].append(f"uploads/{filename}")
+                        media_path = save_upload(image_file)
+                        entry['images'].append(media_path)
+                        queue_media_jobs(media_path, 'image', platform, action_type)
                     except Exception as e:
                         flash(f'Error saving image: {str(e)}', 'error')
                 else:
                     flash('Invalid image file type', 'error')
     
+    # Remote media, copied to local storage in the background when mirroring is on
+    mirror_urls = []
+    
     # Handle image URLs
     if 'image_urls' in request.form and request.form['image_urls'].strip():
         urls = [url.strip() for url in request.form['image_urls'].split(',') if url.strip()]
-        content[platform][action_type]['images'].extend(urls)
+        entry['images'].extend(urls)
+        mirror_urls.extend((url, 'image') for url in urls)
     
     # Handle video uploads
     if 'video_files' in request.files:
@@ -1055,10 +996,9 @@ def update_content():
             if video_file.filename != '':
                 if allowed_file(video_file.filename, 'video'):
                     try:
-                        filename = secure_filename(f"{platform}_{action_type}_vid_{datetime.now().timestamp()}_{video_file.filename}")
-                        video_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                        video_file.save(video_path)
-                        content[platform][action_type]['videos'].append(f"uploads/{filename}")
+                        media_path = save_upload(video_file)
+                        entry['videos'].append(media_path)
+                        queue_media_jobs(media_path, 'video', platform, action_type)
                     except Exception as e:
                         flash(f'Error saving video: {str(e)}', 'error')
                 else:
@@ -1067,11 +1007,103 @@ def update_content():
     # Handle video URLs
     if 'video_urls' in request.form and request.form['video_urls'].strip():
         urls = [url.strip() for url in request.form['video_urls'].split(',') if url.strip()]
-        content[platform][action_type]['videos'].extend(urls)
+        entry['videos'].extend(urls)
+        mirror_urls.extend((url, 'video') for url in urls)
     
-    save_content(content)
+    save_entry(platform, action_type, entry)
+    queue_static_export(platform, action_type)
+    queue_mirror_jobs(mirror_urls, platform, action_type)
     flash('Content updated successfully', 'success')
-    return redirect(url_for('index', _anchor='admin'))
+    return redirect(url_for('admin_panel', _anchor=platform))
+
+def upload_error_response(error):
+    body = {'success': False, 'error': str(error)}
+    if error.offset is not None:
+        body['received'] = error.offset
+    return jsonify(body), error.status
+
+@app.route('/api/uploads', methods=['POST'])
+def create_upload():
+    if 'admin' not in session:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    platform = data.get('platform')
+    action = data.get('action')
+    media_type = data.get('media_type')
+    filename = data.get('filename') or ''
+    size = data.get('size')
+    
+    if not platform or not action or media_type not in ['image', 'video'] or not isinstance(size, int):
+        return jsonify({'success': False, 'error': 'Invalid request'}), 400
+    if not allowed_file(filename, media_type):
+        return jsonify({'success': False, 'error': f'Invalid {media_type} file type'}), 400
+    
+    content = load_content()
+    if platform not in content or action not in content[platform]:
+        return jsonify({'success': False, 'error': 'Content not found'}), 404
+    
+    try:
+        upload_id = chunked_uploads.create(filename, size, platform=platform, action=action, media_type=media_type)
+    except UploadError as e:
+        return upload_error_response(e)
+    return jsonify({'success': True, 'upload_id': upload_id, 'received': 0,
+                    'chunk_size': app.config['UPLOAD_CHUNK_SIZE']}), 201
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    # Resuming clients ask where to continue from
+    if 'admin' not in session:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    try:
+        info = chunked_uploads.info(upload_id)
+    except UploadError as e:
+        return upload_error_response(e)
+    return jsonify({'success': True, 'upload_id': upload_id, 'received': info['received'], 'size': info['size'],
+                    'chunk_size': app.config['UPLOAD_CHUNK_SIZE']})
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    # Body is the raw chunk; Upload-Offset says where in the file it starts
+    if 'admin' not in session:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Missing Upload-Offset header'}), 400
+    
+    try:
+        with metrics.timed('app_phase_seconds', phase='file_io'):
+            received = chunked_uploads.write_chunk(upload_id, offset, request.stream)
+    except UploadError as e:
+        return upload_error_response(e)
+    return jsonify({'success': True, 'received': received})
+
+@app.route('/api/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_upload(upload_id):
+    # Moves the assembled file into media storage and appends it to its guide
+    if 'admin' not in session:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    
+    try:
+        info = chunked_uploads.info(upload_id)
+        content = load_content()
+        if info['platform'] not in content or info['action'] not in content[info['platform']]:
+            return jsonify({'success': False, 'error': 'Content not found'}), 404
+        with metrics.timed('app_phase_seconds', phase='file_io'):
+            media_path, info = chunked_uploads.finalize(upload_id, info['filename'].rsplit('.', 1)[1])
+    except UploadError as e:
+        return upload_error_response(e)
+    metrics.inc('app_upload_bytes_total', info['size'])
+    
+    platform, action, media_type = info['platform'], info['action'], info['media_type']
+    entry = thaw(load_content()[platform][action])
+    entry[f"{media_type}s"].append(media_path)
+    save_entry(platform, action, entry)
+    queue_media_jobs(media_path, media_type, platform, action)
+    queue_static_export(platform, action)
+    
+    return jsonify({'success': True, 'media_path': media_path})
 
 @app.route('/remove_media', methods=['POST'])
 def remove_media():
@@ -1092,27 +1124,53 @@ def remove_media():
     if platform not in content or action not in content[platform]:
         return jsonify({'success': False, 'error': 'Content not found'}), 404
     
+    entry = thaw(content[platform][action])
     media_key = f"{media_type}s"
-    if 0 <= index < len(content[platform][action][media_key]):
-        # Remove the media file if it exists locally
-        media_path = content[platform][action][media_key][index]
-        if media_path and not media_path.startswith('http'):
-            try:
-                file_path = os.path.join('static', media_path)
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            except Exception as e:
-                print(f"Error removing file: {e}")
-        
+    if 0 <= index < len(entry[media_key]):
         # Remove the media reference
-        content[platform][action][media_key].pop(index)
-        save_content(content)
+        media_path = entry[media_key].pop(index)
+        mirrored = entry.get('mirrored_from')
+        if mirrored and media_path in mirrored and media_path not in entry['images'] + entry['videos']:
+            del mirrored[media_path]
+            if not mirrored:
+                del entry['mirrored_from']
+        save_entry(platform, action, entry)
+        queue_static_export(platform, action)
+        
+        # Remove the file once no other guide uses it
+        try:
+            with metrics.timed('app_phase_seconds', phase='file_io'):
+                if media_storage.release(load_content(), media_path):
+                    media_derivatives.remove_derivatives(media_storage, media_path)
+        except Exception as e:
+            print(f"Error removing file: {e}")
     
     return jsonify({'success': True})
 
+@app.route('/static/bundles/<filename>')
+def asset(filename):
+    return assets.response(filename)
+
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return send_media(app.config['UPLOAD_FOLDER'], filename, app.config['MEDIA_ACCEL_REDIRECT'])
+
+# With gunicorn --preload and PRELOAD_CONTENT=1 the content is loaded once in the master
+# and frozen out of the garbage collector's generations, so forked workers keep sharing
+# those pages instead of copying them when a collection touches every object
+if os.environ.get('PRELOAD_CONTENT') == '1':
+    content_store.snapshot()
+    gc.freeze()
+
+# gzip/brotli for HTML and JSON responses; asset bundles arrive already compressed
+app.wsgi_app = CompressionMiddleware(app.wsgi_app, min_size=int(os.environ.get('COMPRESSION_MIN_SIZE', 500)))
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    if sys.argv[1:2] == ['export']:
+        # python mysite.py export [output_dir]: render every public page to static files
+        output_dir = sys.argv[2] if len(sys.argv) > 2 else app.config['STATIC_EXPORT_DIR'] or 'static_site'
+        exporter = StaticExporter(app, output_dir, assets, MEDIA_PAGE_SIZE)
+        count = exporter.export_all(load_content())
+        print(f"Exported {count} pages to {output_dir}")
+    else:
+        app.run(debug=True)
\ No newline at end of file
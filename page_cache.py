@@ -0,0 +1,41 @@
+import threading
+from collections import OrderedDict
+
+
+class PageCache:
+    """Bounded LRU of rendered HTML pages.
+
+    Each entry remembers the content version it was rendered from, so a page is
+    never served after content.json changes, even when another worker saved it.
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != version:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, version, page):
+        if key is None:
+            return
+        with self._lock:
+            self._entries[key] = (version, page)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
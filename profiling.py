@@ -0,0 +1,73 @@
+import cProfile
+import io
+import itertools
+import pstats
+import random
+import threading
+import time
+from collections import deque
+
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+
+class RequestProfiler:
+    """cProfile captures of individual requests, keeping the most recent ones in memory.
+
+    A request is profiled when an admin asks for it (?_profile=1 or an X-Profile: 1
+    header, checked by the app's start_profile hook) or when it is picked by
+    sample_rate. Captures live in a ring buffer of max_profiles entries, so
+    memory stays bounded however long the worker runs. The app only installs its
+    request hooks when profiling is enabled, so nothing runs otherwise.
+    """
+
+    def __init__(self, enabled=False, sample_rate=0.0, max_profiles=20):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self._profiles = deque(maxlen=max_profiles)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def should_sample(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # another profiler is already active in this thread
+            return None
+        return profile, time.perf_counter()
+
+    def finish(self, capture, method, path, status):
+        profile, started = capture
+        profile.disable()
+        duration = time.perf_counter() - started
+        entry = {
+            'id': next(self._ids),
+            'time': time.time(),
+            'method': method,
+            'path': path,
+            'status': status,
+            'duration_ms': round(duration * 1000, 2),
+            'stats': pstats.Stats(profile),
+        }
+        with self._lock:
+            self._profiles.append(entry)
+        return entry
+
+    def summaries(self):
+        with self._lock:
+            entries = list(self._profiles)
+        return [{key: value for key, value in entry.items() if key != 'stats'} for entry in reversed(entries)]
+
+    def report(self, profile_id, sort='cumulative', limit=60):
+        with self._lock:
+            entry = next((e for e in self._profiles if e['id'] == profile_id), None)
+        if entry is None:
+            return None
+        stream = io.StringIO()
+        stream.write(f"{entry['method']} {entry['path']} -> {entry['status']} in {entry['duration_ms']} ms\n\n")
+        stats = entry['stats']
+        stats.stream = stream
+        stats.sort_stats(sort if sort in SORT_KEYS else 'cumulative').print_stats(limit)
+        return stream.getvalue()
@@ -0,0 +1,127 @@
+import bisect
+import math
+import re
+import threading
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Matches in names count for more than matches deep in guide text
+FIELD_WEIGHTS = {
+    'platform': 15.0,
+    'action': 10.0,
+    'text': 3.0,
+    'additional_content': 1.0,
+}
+
+
+def tokenize(text):
+    return [token.lower() for token in TOKEN_RE.findall(text or '')]
+
+
+class SearchIndex:
+    """Inverted index from tokens to (platform, action) postings with scores.
+
+    sync() is called with each content snapshot; only entries whose fields changed
+    since the last sync are re-indexed, so admin edits cost one entry's worth of work.
+    """
+
+    def __init__(self, action_labels):
+        self.action_labels = action_labels
+        self._lock = threading.Lock()
+        self._version = object()
+        self._postings = {}
+        self._documents = {}
+        self._sorted_tokens = []
+
+    def _document_fields(self, platform, action, entry):
+        return (
+            ('platform', platform),
+            ('action', self.action_labels.get(action, action.replace('_', ' '))),
+            ('text', entry.get('text', '')),
+            ('additional_content', entry.get('additional_content', '')),
+        )
+
+    def _scores(self, fields):
+        counts = {}
+        for field, value in fields:
+            for token in tokenize(value):
+                counts.setdefault(token, {}).setdefault(field, 0)
+                counts[token][field] += 1
+        return {
+            token: sum(FIELD_WEIGHTS[field] * (1 + math.log(tf)) for field, tf in fields_tf.items())
+            for token, fields_tf in counts.items()
+        }
+
+    def _remove(self, key):
+        _, scores = self._documents.pop(key)
+        for token in scores:
+            postings = self._postings[token]
+            del postings[key]
+            if not postings:
+                del self._postings[token]
+
+    def _add(self, key, fields):
+        scores = self._scores(fields)
+        self._documents[key] = (fields, scores)
+        for token, score in scores.items():
+            self._postings.setdefault(token, {})[key] = score
+
+    def sync(self, version, content):
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            seen = set()
+            for platform, actions in content.items():
+                for action, entry in actions.items():
+                    key = (platform, action)
+                    seen.add(key)
+                    fields = self._document_fields(platform, action, entry)
+                    document = self._documents.get(key)
+                    if document is not None and document[0] == fields:
+                        continue
+                    if document is not None:
+                        self._remove(key)
+                    self._add(key, fields)
+            for key in set(self._documents) - seen:
+                self._remove(key)
+            self._sorted_tokens = sorted(self._postings)
+            self._version = version
+
+    def _expand(self, token):
+        # Prefix match, so results appear while the last word is still being typed
+        start = bisect.bisect_left(self._sorted_tokens, token)
+        for index in range(start, len(self._sorted_tokens)):
+            candidate = self._sorted_tokens[index]
+            if not candidate.startswith(token):
+                break
+            yield candidate
+
+    def search(self, query, limit=20):
+        # Returns [(platform, action, score)], best first; every query word must match
+        tokens = [token for token in tokenize(query) if len(token) >= 2]
+        if not tokens:
+            return []
+
+        with self._lock:
+            return self._search(tokens, limit)
+
+    def _search(self, tokens, limit):
+        results = None
+        for token in tokens:
+            matches = {}
+            for candidate in self._expand(token):
+                # Exact token matches beat prefix matches
+                boost = 1.0 if candidate == token else len(token) / len(candidate)
+                for key, score in self._postings.get(candidate, {}).items():
+                    matches[key] = max(matches.get(key, 0), score * boost)
+            if results is None:
+                results = matches
+            else:
+                results = {key: results[key] + score for key, score in matches.items() if key in results}
+            if not results:
+                return []
+
+        ranked = sorted(results.items(), key=lambda item: (-item[1], item[0]))
+        return [(platform, action, score) for (platform, action), score in ranked[:limit]]
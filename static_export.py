@@ -0,0 +1,96 @@
+import gzip
+import os
+import shutil
+
+from content_backends import atomic_write
+
+# Exported pages are also written gzipped for nginx's gzip_static
+GZIP_TYPES = ('.html', '.json', '.css', '.js')
+
+
+class StaticExporter:
+    """Writes the public pages to output_dir so a web server can serve them directly.
+
+    Pages are rendered through the app itself (an anonymous test client), so the
+    files are byte-for-byte what Flask would have sent. Every file is written
+    atomically, so the server never sees a half-written page. Layout:
+
+        index.html                                   /
+        content/<platform>/<action>/index.html       /content/<platform>/<action>
+        api/media/<platform>/<action>/<type>/<offset>.json
+                                                     /api/media/...?offset=<offset>
+        static/bundles/<bundle>                      /static/bundles/<bundle>
+
+    A matching nginx setup sends everything else (admin, login, search, uploads)
+    to the app. The exported index is the anonymous one, so requests for / that
+    carry a query string (?login_error=...) or a session cookie (admins, flashed
+    messages after a redirect) go to the app as well:
+
+        map "$args$cookie_session" $index_from_app { "" 0; default 1; }
+
+        error_page 418 = @app;
+        location = / {
+            if ($index_from_app) { return 418; }
+            try_files /index.html @app;
+        }
+        location /content/ { try_files $uri/index.html @app; }
+        location /api/media/ { try_files $uri/$arg_offset.json @app; }
+        location /static/bundles/ { try_files $uri @app; }
+    """
+
+    def __init__(self, app, output_dir, assets, media_page_size):
+        self.app = app
+        self.output_dir = output_dir
+        self.assets = assets
+        self.media_page_size = media_page_size
+
+    def _write(self, relative_path, body):
+        path = os.path.join(self.output_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path, body)
+        if path.endswith(GZIP_TYPES):
+            atomic_write(path + '.gz', gzip.compress(body, compresslevel=9, mtime=0))
+
+    def _render(self, client, url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} returned {response.status_code}")
+        return response.get_data()
+
+    def export_index(self, client):
+        self._write('index.html', self._render(client, '/'))
+
+    def export_entry(self, client, platform, action, entry):
+        self._write(os.path.join('content', platform, action, 'index.html'),
+                    self._render(client, f'/content/{platform}/{action}'))
+
+        # Gallery pages are rewritten from scratch, so pages past a removed item disappear
+        media_dir = os.path.join(self.output_dir, 'api', 'media', platform, action)
+        shutil.rmtree(media_dir, ignore_errors=True)
+        for media_type in ('image', 'video'):
+            items = entry[f'{media_type}s']
+            for offset in range(self.media_page_size, len(items), self.media_page_size):
+                self._write(os.path.join('api', 'media', platform, action, media_type, f'{offset}.json'),
+                            self._render(client, f'/api/media/{platform}/{action}/{media_type}?offset={offset}'))
+
+    def export_assets(self):
+        for bundle in self.assets.bundles.values():
+            self._write(os.path.join('static', 'bundles', bundle.filename), bundle.body)
+
+    def export_all(self, content):
+        client = self.app.test_client()
+        self.export_assets()
+        self.export_index(client)
+        count = 1
+        for platform, actions in content.items():
+            for action, entry in actions.items():
+                self.export_entry(client, platform, action, entry)
+                count += 1
+        return count
+
+    def export_changed(self, content, platform, action):
+        # After an edit only the index (which lists every guide) and that guide change
+        client = self.app.test_client()
+        self.export_index(client)
+        if platform in content and action in content[platform]:
+            self.export_entry(client, platform, action, content[platform][action])
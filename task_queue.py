@@ -0,0 +1,52 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskQueue:
+    """Per-process background worker pool for work that must stay out of the request path.
+
+    Jobs are submitted with a key; a key that is already queued or running is not
+    queued again. The pool is created lazily so each gunicorn worker gets its own
+    threads, including after a fork from a preloaded master.
+    """
+
+    def __init__(self, max_workers=2, name='tasks'):
+        self.max_workers = max_workers
+        self.name = name
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._pending = {}
+
+    def _get_executor(self):
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+            self._pid = os.getpid()
+            self._pending = {}
+        return self._executor
+
+    def submit(self, key, func, *args):
+        with self._lock:
+            executor = self._get_executor()
+            if key in self._pending:
+                return self._pending[key]
+            future = executor.submit(self._run, key, func, args)
+            self._pending[key] = future
+            return future
+
+    def _run(self, key, func, args):
+        try:
+            return func(*args)
+        except Exception as e:
+            print(f"Error in background task {key}: {e}")
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def wait(self):
+        # Block until everything queued so far has finished (used by CLI commands and benchmarks)
+        with self._lock:
+            futures = list(self._pending.values())
+        for future in futures:
+            future.result()
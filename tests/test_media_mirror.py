@@ -0,0 +1,129 @@
+import http.server
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from media_mirror import MediaMirror, MirrorError  # noqa: E402
+from media_storage import MediaStorage  # noqa: E402
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 4
+ALLOWED = {'image': {'png', 'jpg', 'jpeg', 'gif'}, 'video': {'mp4', 'webm', 'ogg'}}
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    # Plays a remote media host: one route per case the mirror has to handle
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, content_type, body, length=True):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        if length:
+            self.send_header('Content-Length', str(len(body)))
+        else:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/image.png':
+            self._send(200, 'image/png', PNG)
+        elif self.path == '/redirect':
+            self.send_response(302)
+            self.send_header('Location', '/image.png')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif self.path == '/loop':
+            self.send_response(302)
+            self.send_header('Location', '/loop')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif self.path == '/large.png':
+            self._send(200, 'image/png', PNG * 4)
+        elif self.path == '/large-unsized.png':
+            self._send(200, 'image/png', PNG * 4, length=False)
+        elif self.path == '/page.png':
+            self._send(200, 'text/html', b'<html></html>')
+        else:
+            self._send(404, 'text/plain', b'not found')
+
+
+class MediaMirrorTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.storage = MediaStorage(self.root)
+        self.mirror = MediaMirror(self.storage, ALLOWED, timeout=5, max_bytes=len(PNG) * 2, allow_private=True)
+
+    def tearDown(self):
+        self.mirror.pool.close()
+        shutil.rmtree(self.root)
+
+    def stored_files(self):
+        return sorted(name for name in os.listdir(self.root) if not name.startswith('.'))
+
+    def test_fetch_stores_the_file(self):
+        media_path = self.mirror.fetch(self.base + '/image.png', 'image')
+        self.assertTrue(media_path.startswith('uploads/') and media_path.endswith('.png'))
+        with open(self.storage.file_path(media_path), 'rb') as f:
+            self.assertEqual(f.read(), PNG)
+
+    def test_redirect_is_followed(self):
+        self.assertEqual(self.mirror.fetch(self.base + '/redirect', 'image'),
+                         self.mirror.fetch(self.base + '/image.png', 'image'))
+
+    def test_redirect_loop_is_refused(self):
+        with self.assertRaisesRegex(MirrorError, 'Too many redirects'):
+            self.mirror.fetch(self.base + '/loop', 'image')
+
+    def test_oversize_body_is_refused(self):
+        for path in ('/large.png', '/large-unsized.png'):
+            with self.subTest(path=path):
+                with self.assertRaisesRegex(MirrorError, 'size limit'):
+                    self.mirror.fetch(self.base + path, 'image')
+        self.assertEqual(self.stored_files(), [])
+
+    def test_wrong_content_type_is_refused(self):
+        with self.assertRaisesRegex(MirrorError, 'content type text/html'):
+            self.mirror.fetch(self.base + '/page.png', 'image')
+        with self.assertRaisesRegex(MirrorError, 'expected video'):
+            self.mirror.fetch(self.base + '/image.png', 'video')
+        self.assertEqual(self.stored_files(), [])
+
+    def test_error_status_is_refused(self):
+        with self.assertRaisesRegex(MirrorError, 'returned 404'):
+            self.mirror.fetch(self.base + '/missing.png', 'image')
+
+    def test_private_addresses_are_refused_by_default(self):
+        mirror = MediaMirror(self.storage, ALLOWED, timeout=5)
+        with self.assertRaisesRegex(MirrorError, 'non-public address'):
+            mirror.fetch(self.base + '/image.png', 'image')
+        with self.assertRaisesRegex(MirrorError, 'Cannot mirror'):
+            mirror.fetch('file:///etc/passwd', 'image')
+
+    def test_connections_are_reused(self):
+        self.mirror.fetch(self.base + '/image.png', 'image')
+        self.mirror.fetch(self.base + '/image.png', 'image')
+        idle = self.mirror.pool._idle[('http', '127.0.0.1', self.server.server_address[1])]
+        self.assertEqual(len(idle), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
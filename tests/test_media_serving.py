@@ -0,0 +1,102 @@
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+
+from media_serving import MAX_RANGES, send_media  # noqa: E402
+
+BLOB = bytes(range(256)) * 40
+
+
+class SendMediaTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.name = hashlib.sha256(BLOB).hexdigest() + '.mp4'
+        with open(os.path.join(self.root, self.name), 'wb') as f:
+            f.write(BLOB)
+        app = Flask(__name__)
+        app.add_url_rule('/uploads/<filename>', 'uploads', lambda filename: send_media(self.root, filename))
+        self.client = app.test_client()
+        self.url = f'/uploads/{self.name}'
+        self.etag = f'"{self.name}"'
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def get(self, **headers):
+        return self.client.get(self.url, headers=headers)
+
+    def assertWholeFile(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, BLOB)
+
+    def test_full_file_is_cached_forever(self):
+        response = self.get()
+        self.assertWholeFile(response)
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+
+    def test_single_range(self):
+        response = self.get(Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, BLOB[10:20])
+        self.assertEqual(response.headers['Content-Range'], f'bytes 10-19/{len(BLOB)}')
+
+    def test_multiple_ranges(self):
+        response = self.get(Range='bytes=0-4,-3')
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response.mimetype.startswith('multipart/byteranges'))
+        self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+        self.assertIn(f'Content-Range: bytes 0-4/{len(BLOB)}'.encode(), response.data)
+        self.assertIn(f'Content-Range: bytes {len(BLOB) - 3}-{len(BLOB) - 1}/{len(BLOB)}'.encode(), response.data)
+        self.assertIn(BLOB[:5], response.data)
+        self.assertIn(BLOB[-3:], response.data)
+
+    def test_overlapping_ranges_get_the_whole_file(self):
+        self.assertWholeFile(self.get(Range='bytes=0-9,5-15'))
+
+    def test_too_many_ranges_get_the_whole_file(self):
+        ranges = ','.join(f'{i * 10}-{i * 10 + 1}' for i in range(MAX_RANGES + 4))
+        self.assertWholeFile(self.get(Range=f'bytes={ranges}'))
+
+    def test_one_satisfiable_part_is_a_single_range(self):
+        response = self.get(Range=f'bytes=2-5,{len(BLOB) + 10}-')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, BLOB[2:6])
+        self.assertEqual(response.headers['Content-Range'], f'bytes 2-5/{len(BLOB)}')
+
+    def test_unsatisfiable_range(self):
+        self.assertEqual(self.get(Range=f'bytes={len(BLOB) + 5}-').status_code, 416)
+
+    def test_if_range(self):
+        self.assertEqual(self.get(Range='bytes=0-4,-3', **{'If-Range': self.etag}).status_code, 206)
+        self.assertWholeFile(self.get(Range='bytes=0-4,-3', **{'If-Range': '"other"'}))
+        self.assertWholeFile(self.get(Range='bytes=10-19', **{'If-Range': '"other"'}))
+
+    def test_if_none_match_comes_before_range(self):
+        self.assertEqual(self.get(**{'If-None-Match': self.etag}).status_code, 304)
+        for value in ('bytes=10-19', 'bytes=0-9,20-29'):
+            with self.subTest(range=value):
+                response = self.get(Range=value, **{'If-None-Match': self.etag})
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.headers['ETag'], self.etag)
+                self.assertEqual(response.data, b'')
+
+    def test_if_modified_since_comes_before_range(self):
+        last_modified = self.get().headers['Last-Modified']
+        response = self.get(Range='bytes=0-9,20-29', **{'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_and_escaping_paths(self):
+        self.assertEqual(self.client.get('/uploads/missing.mp4').status_code, 404)
+        self.assertEqual(self.client.get('/uploads/..%2Fsecret').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()